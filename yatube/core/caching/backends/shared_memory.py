@@ -0,0 +1,282 @@
+"""Кэш в общей памяти: файл, отображенный в память всеми процессами хоста.
+
+Файл - хеш-таблица фиксированного размера: ключ попадает в корзину из
+WAYS слотов по хешу, в корзине ищется линейно. Когда свободных слотов нет,
+вытесняется запись по алгоритму CLOCK (бит обращения, стрелка на
+корзину). Корзины блокируются по отдельности: fcntl между процессами,
+threading.Lock между потоками одного процесса. Значение больше слота не
+кэшируется.
+
+    CACHES = {
+        'shared': {
+            'BACKEND': 'core.caching.backends.shared_memory.'
+                       'SharedMemoryCache',
+            'LOCATION': '/dev/shm/yatube-cache',
+            'OPTIONS': {'SLOTS': 4096, 'SLOT_SIZE': 32768},
+        },
+    }
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+MAGIC = b'YTBSHM01'
+HEADER = struct.Struct('<8sIII')
+HEADER_SIZE = 64
+# state, reference bit, flags, hash, expiry (0 - never), key and value size
+SLOT = struct.Struct('<BBBxQdHI')
+WAYS = 8
+EMPTY, USED = 0, 1
+COMPRESSED = 1
+# Rendered pages compress several times over, tiny values are not worth it
+COMPRESS_MIN_SIZE = 1024
+THREAD_LOCK_STRIPES = 64
+
+# Every process maps each file once, all cache instances share the mapping
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+class _Table:
+
+    def __init__(self, path, slots, slot_size):
+        self.buckets = max(slots // WAYS, 1)
+        self.slot_size = slot_size
+        self.slots_offset = HEADER_SIZE + self.buckets
+        size = self.slots_offset + self.buckets * WAYS * slot_size
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.lockf(self.fd, fcntl.LOCK_EX, HEADER_SIZE, 0)
+        try:
+            if os.fstat(self.fd).st_size != size:
+                os.ftruncate(self.fd, size)
+            self.map = mmap.mmap(self.fd, size)
+            magic, buckets, slot_size_, _ = HEADER.unpack_from(self.map, 0)
+            if (magic, buckets, slot_size_) != (
+                MAGIC, self.buckets, slot_size
+            ):
+                # A new file or another geometry: start from an empty table
+                self.map[:] = bytes(size)
+                HEADER.pack_into(
+                    self.map, 0, MAGIC, self.buckets, slot_size, 0
+                )
+        finally:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, HEADER_SIZE, 0)
+        self.thread_locks = [
+            threading.Lock() for _ in range(THREAD_LOCK_STRIPES)
+        ]
+
+    @contextmanager
+    def locked(self, bucket, exclusive):
+        # One byte per bucket (its CLOCK hand) doubles as the fcntl range
+        with self.thread_locks[bucket % THREAD_LOCK_STRIPES]:
+            mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            fcntl.lockf(self.fd, mode, 1, HEADER_SIZE + bucket)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, HEADER_SIZE + bucket)
+
+    def slot_offset(self, bucket, way):
+        return self.slots_offset + (bucket * WAYS + way) * self.slot_size
+
+    def find(self, bucket, key_hash, key, now):
+        """Номер слота с живой записью ключа или None."""
+        for way in range(WAYS):
+            offset = self.slot_offset(bucket, way)
+            state, _, _, slot_hash, expires, key_len, _ = SLOT.unpack_from(
+                self.map, offset
+            )
+            if state != USED or slot_hash != key_hash:
+                continue
+            start = offset + SLOT.size
+            if self.map[start:start + key_len] != key:
+                continue
+            if expires and expires <= now:
+                self.map[offset] = EMPTY
+                return None
+            return way
+        return None
+
+    def read(self, bucket, way):
+        offset = self.slot_offset(bucket, way)
+        _, _, flags, _, _, key_len, value_len = SLOT.unpack_from(
+            self.map, offset
+        )
+        # Reference bit for CLOCK; a lost update under a shared lock only
+        # makes the entry a little easier to evict
+        self.map[offset + 1] = 1
+        start = offset + SLOT.size + key_len
+        return flags, self.map[start:start + value_len]
+
+    def victim(self, bucket, now):
+        """Свободный или просроченный слот, иначе вытесняемый по CLOCK."""
+        for way in range(WAYS):
+            offset = self.slot_offset(bucket, way)
+            state, _, _, _, expires, _, _ = SLOT.unpack_from(
+                self.map, offset
+            )
+            if state != USED or (expires and expires <= now):
+                return way
+        hand_offset = HEADER_SIZE + bucket
+        hand = self.map[hand_offset] % WAYS
+        while True:
+            offset = self.slot_offset(bucket, hand)
+            if not self.map[offset + 1]:
+                self.map[hand_offset] = (hand + 1) % WAYS
+                return hand
+            self.map[offset + 1] = 0
+            hand = (hand + 1) % WAYS
+
+    def write(self, bucket, way, key_hash, key, flags, value, expires):
+        offset = self.slot_offset(bucket, way)
+        start = offset + SLOT.size
+        self.map[offset] = EMPTY
+        self.map[start:start + len(key)] = key
+        self.map[start + len(key):start + len(key) + len(value)] = value
+        # The header goes last, a crash mid-write leaves the slot EMPTY.
+        # New entries start unreferenced, so one-off writes go first
+        SLOT.pack_into(
+            self.map, offset, USED, 0, flags, key_hash, expires or 0,
+            len(key), len(value)
+        )
+
+    def erase(self, bucket, way):
+        self.map[self.slot_offset(bucket, way)] = EMPTY
+
+
+def _open_table(path, slots, slot_size):
+    with _tables_lock:
+        table = _tables.get(path)
+        if table is None:
+            table = _tables[path] = _Table(path, slots, slot_size)
+        return table
+
+
+class SharedMemoryCache(BaseCache):
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._slots = int(options.get('SLOTS', 4096))
+        self._slot_size = int(options.get('SLOT_SIZE', 32768))
+
+    @property
+    def _table(self):
+        return _open_table(self._path, self._slots, self._slot_size)
+
+    def _locate(self, key, version):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        raw = key.encode()
+        digest = hashlib.blake2b(raw, digest_size=8).digest()
+        key_hash = int.from_bytes(digest, 'little')
+        return raw, key_hash, key_hash % self._table.buckets
+
+    def _pack(self, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) >= COMPRESS_MIN_SIZE:
+            return COMPRESSED, zlib.compress(data, 1)
+        return 0, data
+
+    def _unpack(self, flags, data):
+        if flags & COMPRESSED:
+            data = zlib.decompress(data)
+        return pickle.loads(data)
+
+    def _fits(self, raw, data):
+        return SLOT.size + len(raw) + len(data) <= self._slot_size
+
+    def get(self, key, default=None, version=None):
+        raw, key_hash, bucket = self._locate(key, version)
+        table = self._table
+        with table.locked(bucket, exclusive=False):
+            way = table.find(bucket, key_hash, raw, time.time())
+            if way is None:
+                return default
+            flags, data = table.read(bucket, way)
+        return self._unpack(flags, data)
+
+    def _store(self, key, value, timeout, version, only_new=False):
+        raw, key_hash, bucket = self._locate(key, version)
+        flags, data = self._pack(value)
+        expires = self.get_backend_timeout(timeout)
+        table = self._table
+        with table.locked(bucket, exclusive=True):
+            now = time.time()
+            way = table.find(bucket, key_hash, raw, now)
+            if way is not None and only_new:
+                return False
+            if not self._fits(raw, data):
+                # Too big for a slot: at least never serve the old value
+                if way is not None:
+                    table.erase(bucket, way)
+                return False
+            if way is None:
+                way = table.victim(bucket, now)
+            table.write(bucket, way, key_hash, raw, flags, data, expires)
+        return True
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store(key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._store(key, value, timeout, version, only_new=True)
+
+    def incr(self, key, delta=1, version=None):
+        raw, key_hash, bucket = self._locate(key, version)
+        table = self._table
+        with table.locked(bucket, exclusive=True):
+            way = table.find(bucket, key_hash, raw, time.time())
+            if way is None:
+                raise ValueError(f"Key '{key}' not found")
+            offset = table.slot_offset(bucket, way)
+            expires = SLOT.unpack_from(table.map, offset)[4]
+            value = self._unpack(*table.read(bucket, way)) + delta
+            flags, data = self._pack(value)
+            table.write(bucket, way, key_hash, raw, flags, data, expires)
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        raw, key_hash, bucket = self._locate(key, version)
+        table = self._table
+        with table.locked(bucket, exclusive=True):
+            way = table.find(bucket, key_hash, raw, time.time())
+            if way is None:
+                return False
+            flags, data = table.read(bucket, way)
+            table.write(
+                bucket, way, key_hash, raw, flags, data,
+                self.get_backend_timeout(timeout)
+            )
+        return True
+
+    def delete(self, key, version=None):
+        raw, key_hash, bucket = self._locate(key, version)
+        table = self._table
+        with table.locked(bucket, exclusive=True):
+            way = table.find(bucket, key_hash, raw, time.time())
+            if way is not None:
+                table.erase(bucket, way)
+
+    def has_key(self, key, version=None):
+        raw, key_hash, bucket = self._locate(key, version)
+        table = self._table
+        with table.locked(bucket, exclusive=False):
+            return table.find(bucket, key_hash, raw, time.time()) is not None
+
+    def clear(self):
+        table = self._table
+        for bucket in range(table.buckets):
+            with table.locked(bucket, exclusive=True):
+                for way in range(WAYS):
+                    table.erase(bucket, way)
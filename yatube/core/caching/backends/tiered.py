@@ -0,0 +1,211 @@
+"""Двухуровневый кэш: LRU в памяти процесса (L1) перед общим кэшем (L2).
+
+L2 - любой настроенный алиас CACHES (memcached, redis, файлы, БД). Рядом
+с каждым значением в L2 лежит штамп, новый при каждой записи. Процесс
+отдает значение из L1 без обращения к L2, пока с последней сверки штампа
+прошло меньше CHECK_INTERVAL секунд; потом сверяет только штамп и
+перечитывает значение, если его переписал другой процесс.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.caching.backends.tiered.TieredCache',
+            'OPTIONS': {'L2': 'shared', 'MAX_ENTRIES': 1000},
+        },
+        'shared': {...},
+    }
+"""
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# L1 stores live per process and are shared by all threads, like LocMemCache
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _new_stamp():
+    return os.urandom(8).hex()
+
+
+def _stamp_key(key):
+    return f'{key}:stamp'
+
+
+class _Entry:
+    __slots__ = ('pickled', 'stamp', 'expires', 'checked')
+
+    def __init__(self, pickled, stamp, expires, checked):
+        self.pickled = pickled
+        self.stamp = stamp
+        self.expires = expires
+        self.checked = checked
+
+
+class TieredCache(BaseCache):
+
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = options['L2']
+        self._check_interval = float(options.get('CHECK_INTERVAL', 1))
+        with _stores_lock:
+            self._store, self._lock = _stores.setdefault(
+                name, (OrderedDict(), threading.RLock())
+            )
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    # L1
+
+    def _remember(self, l1_key, value, stamp, timeout=DEFAULT_TIMEOUT):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        entry = _Entry(
+            pickle.dumps(value, pickle.HIGHEST_PROTOCOL), stamp, expires, now
+        )
+        with self._lock:
+            self._store[l1_key] = entry
+            self._store.move_to_end(l1_key)
+            while len(self._store) > self._max_entries:
+                self._store.popitem(last=False)
+
+    def _forget(self, l1_key):
+        with self._lock:
+            self._store.pop(l1_key, None)
+
+    def _lookup(self, l1_key):
+        with self._lock:
+            entry = self._store.get(l1_key)
+            if entry is None:
+                return None
+            if entry.expires is not None and entry.expires <= time.time():
+                del self._store[l1_key]
+                return None
+            self._store.move_to_end(l1_key)
+            return entry
+
+    # Reads
+
+    def get_many(self, keys, version=None):
+        now = time.time()
+        found = {}
+        to_check = {}
+        to_fetch = []
+        for key in keys:
+            entry = self._lookup(self.make_key(key, version))
+            if entry is None:
+                to_fetch.append(key)
+            elif now - entry.checked < self._check_interval:
+                found[key] = pickle.loads(entry.pickled)
+            else:
+                to_check[key] = entry
+        if to_check:
+            to_fetch.extend(self._check(to_check, found, now, version))
+        if to_fetch:
+            found.update(self._fetch(to_fetch, version))
+        return found
+
+    def _check(self, entries, found, now, version):
+        """Сверяет штампы записей L1 с L2; возвращает устаревшие ключи."""
+        stamps = self.l2.get_many(
+            [_stamp_key(key) for key in entries], version=version
+        )
+        changed = []
+        for key, entry in entries.items():
+            if stamps.get(_stamp_key(key)) == entry.stamp:
+                entry.checked = now
+                found[key] = pickle.loads(entry.pickled)
+            else:
+                changed.append(key)
+        return changed
+
+    def _fetch(self, keys, version):
+        wanted = keys + [_stamp_key(key) for key in keys]
+        fetched = self.l2.get_many(wanted, version=version)
+        found = {}
+        for key in keys:
+            l1_key = self.make_key(key, version)
+            if key not in fetched:
+                self._forget(l1_key)
+                continue
+            stamp = fetched.get(_stamp_key(key))
+            if stamp is None:
+                # The stamp was evicted, issue one so it can be compared
+                stamp = _new_stamp()
+                if not self.l2.add(_stamp_key(key), stamp, version=version):
+                    stamp = self.l2.get(_stamp_key(key), version=version)
+            found[key] = fetched[key]
+            self._remember(l1_key, fetched[key], stamp)
+        return found
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def has_key(self, key, version=None):
+        return key in self.get_many([key], version=version)
+
+    # Writes
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        stamps = {key: _new_stamp() for key in data}
+        # The value goes first: a reader that sees the new stamp must also
+        # find the new value
+        failed = self.l2.set_many(data, timeout, version=version)
+        self.l2.set_many(
+            {_stamp_key(key): stamp for key, stamp in stamps.items()},
+            timeout, version=version
+        )
+        for key, value in data.items():
+            self._remember(
+                self.make_key(key, version), value, stamps[key], timeout
+            )
+        return failed
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if not self.l2.add(key, value, timeout, version=version):
+            return False
+        stamp = _new_stamp()
+        self.l2.set(_stamp_key(key), stamp, timeout, version=version)
+        self._remember(self.make_key(key, version), value, stamp, timeout)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        value = self.l2.incr(key, delta, version=version)
+        # The counter keeps its TTL in L2, the stamp simply outlives it
+        stamp = _new_stamp()
+        self.l2.set(_stamp_key(key), stamp, None, version=version)
+        self._remember(self.make_key(key, version), value, stamp)
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        touched = self.l2.touch(key, timeout, version=version)
+        if touched:
+            self.l2.touch(_stamp_key(key), timeout, version=version)
+        self._forget(self.make_key(key, version))
+        return touched
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.l2.delete_many(
+            keys + [_stamp_key(key) for key in keys], version=version
+        )
+        for key in keys:
+            self._forget(self.make_key(key, version))
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def clear(self):
+        self.l2.clear()
+        with self._lock:
+            self._store.clear()
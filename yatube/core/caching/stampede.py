@@ -0,0 +1,86 @@
+"""Кэширование, устойчивое к cache stampede.
+
+Запись хранится вместе со временем своего расчета и мягким сроком
+годности. Перед сроком запись иногда пересчитывается заранее (XFetch:
+чем дороже расчет и ближе срок, тем вероятнее). Пересчитывает только
+тот, кто взял блокировку в кэше; остальные отдают старое значение или,
+если его нет, недолго ждут результата.
+"""
+import math
+import random
+import time
+
+from django.core.cache import cache as default_cache
+
+# A crashed worker's lock frees itself after this many seconds
+LOCK_TIMEOUT = 30
+# How long a cold miss waits for another worker's result
+WAIT_TIMEOUT = 5
+POLL_INTERVAL = 0.05
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def should_refresh(delta, expiry, beta=1.0, now=None):
+    """Вероятностное решение пересчитать запись до истечения срока."""
+    now = time.time() if now is None else now
+    # 1 - random() lies in (0, 1], so the logarithm is always defined
+    return now - delta * beta * math.log(1 - random.random()) >= expiry
+
+
+def _compute(cache, key, compute, timeout, stale_timeout, should_cache):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    if should_cache is None or should_cache(value):
+        cache.set(
+            key, (value, delta, time.time() + timeout),
+            timeout + stale_timeout
+        )
+    return value
+
+
+def _wait(cache, key):
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        found = cache.get_many([key, _lock_key(key)])
+        if key in found:
+            return found[key]
+        if _lock_key(key) not in found:
+            # The lock is gone without a result: not cacheable or failed
+            return None
+    return None
+
+
+def get_or_compute(key, compute, timeout, stale_timeout=None, beta=1.0,
+                   cache=None, should_cache=None):
+    """Значение из кэша по `key` или результат `compute()`.
+
+    `timeout` - мягкий срок годности, после него запись еще
+    `stale_timeout` секунд (по умолчанию столько же) отдается, пока ее
+    пересчитывает другой процесс. `should_cache(value)` может запретить
+    сохранять результат.
+    """
+    cache = cache or default_cache
+    stale_timeout = timeout if stale_timeout is None else stale_timeout
+    entry = cache.get(key)
+    if entry is not None:
+        value, delta, expiry = entry
+        if not should_refresh(delta, expiry, beta):
+            return value
+    args = (cache, key, compute, timeout, stale_timeout, should_cache)
+    if cache.add(_lock_key(key), 1, LOCK_TIMEOUT):
+        try:
+            return _compute(*args)
+        finally:
+            cache.delete(_lock_key(key))
+    if entry is not None:
+        # Somebody is already rebuilding it, the old value will do
+        return entry[0]
+    entry = _wait(cache, key)
+    if entry is not None:
+        return entry[0]
+    return _compute(*args)
@@ -0,0 +1,235 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, override_settings
+
+from .backends.shared_memory import SharedMemoryCache
+from .backends.tiered import TieredCache
+from .stampede import _lock_key, get_or_compute, should_refresh
+
+L2_DIR = tempfile.mkdtemp()
+
+
+class StampedeTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = LocMemCache('stampede-tests', {})
+        self.cache.clear()
+        self.calls = 0
+
+    def compute(self, value='свежее', delay=0):
+        def compute():
+            self.calls += 1
+            time.sleep(delay)
+            return value
+        return compute
+
+    def test_value_is_cached(self):
+        """Повторный запрос не пересчитывает значение"""
+        for _ in range(3):
+            value = get_or_compute(
+                'key', self.compute(), 60, cache=self.cache
+            )
+        self.assertEqual(value, 'свежее')
+        self.assertEqual(self.calls, 1)
+
+    def test_single_flight_on_cold_miss(self):
+        """Одновременный промах пересчитывает значение один раз"""
+        results = []
+
+        def worker():
+            results.append(get_or_compute(
+                'key', self.compute(delay=0.2), 60, cache=self.cache
+            ))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ['свежее'] * 8)
+
+    def test_stale_value_served_while_rebuilding(self):
+        """Пока другой процесс пересчитывает, отдается старое значение"""
+        self.cache.set('key', ('старое', 0.1, time.time() - 1), 60)
+        self.cache.add(_lock_key('key'), 1)
+        value = get_or_compute('key', self.compute(), 60, cache=self.cache)
+        self.assertEqual(value, 'старое')
+        self.assertEqual(self.calls, 0)
+
+    def test_expired_value_is_rebuilt(self):
+        """Просроченное значение пересчитывается, если никто не занят"""
+        self.cache.set('key', ('старое', 0.1, time.time() - 1), 60)
+        value = get_or_compute('key', self.compute(), 60, cache=self.cache)
+        self.assertEqual(value, 'свежее')
+        self.assertIsNone(self.cache.get(_lock_key('key')))
+
+    def test_early_refresh_probability(self):
+        """Ранний пересчет вероятнее для дорогих записей у края срока"""
+        now = time.time()
+        with mock.patch('random.random', return_value=0.5):
+            self.assertFalse(should_refresh(0.1, now + 60, now=now))
+            self.assertTrue(should_refresh(100, now + 60, now=now))
+            self.assertTrue(should_refresh(0, now, now=now))
+
+    def test_uncacheable_value_is_not_stored(self):
+        """Результат, который нельзя кэшировать, не сохраняется"""
+        for _ in range(2):
+            get_or_compute(
+                'key', self.compute(), 60, cache=self.cache,
+                should_cache=lambda value: False
+            )
+        self.assertEqual(self.calls, 2)
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'l2': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': L2_DIR,
+    },
+})
+class TieredCacheTests(SimpleTestCase):
+    """Два процесса с собственными L1 и общим файловым L2"""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(L2_DIR, ignore_errors=True)
+
+    def worker(self, name, check_interval=0, max_entries=100):
+        return TieredCache(f'{self.id()}-{name}', {
+            'OPTIONS': {
+                'L2': 'l2',
+                'CHECK_INTERVAL': check_interval,
+                'MAX_ENTRIES': max_entries,
+            },
+        })
+
+    def setUp(self):
+        self.first = self.worker('first')
+        self.second = self.worker('second')
+        self.first.clear()
+
+    def test_hot_key_skips_l2(self):
+        """Свежая запись L1 отдается без обращения к L2"""
+        worker = self.worker('hot', check_interval=60)
+        worker.set('key', 'значение')
+        with mock.patch.object(
+            FileBasedCache, 'get_many', side_effect=AssertionError
+        ), mock.patch.object(
+            FileBasedCache, 'get', side_effect=AssertionError
+        ):
+            self.assertEqual(worker.get('key'), 'значение')
+
+    def test_writes_reach_other_workers(self):
+        """Запись и удаление в одном процессе видны другому"""
+        self.first.set('key', 'старое')
+        self.assertEqual(self.second.get('key'), 'старое')
+        self.first.set('key', 'новое')
+        self.assertEqual(self.second.get('key'), 'новое')
+        self.first.delete('key')
+        self.assertIsNone(self.second.get('key'))
+
+    def test_staleness_is_bounded_by_check_interval(self):
+        """До сверки штампа процесс может отдать старое значение"""
+        lazy = self.worker('lazy', check_interval=60)
+        self.first.set('key', 'старое')
+        self.assertEqual(lazy.get('key'), 'старое')
+        self.first.set('key', 'новое')
+        self.assertEqual(lazy.get('key'), 'старое')
+        self.assertEqual(self.second.get('key'), 'новое')
+
+    def test_incr_is_shared(self):
+        """Счетчик увеличивается в L2 и виден всем процессам"""
+        self.first.set('counter', 1)
+        self.assertEqual(self.second.incr('counter'), 2)
+        self.assertEqual(self.first.get('counter'), 2)
+
+    def test_l1_is_bounded(self):
+        """L1 вытесняет самые старые записи, L2 их сохраняет"""
+        worker = self.worker('small', max_entries=2)
+        for key in ('a', 'b', 'c'):
+            worker.set(key, key)
+        self.assertEqual(len(worker._store), 2)
+        self.assertEqual(worker.get('a'), 'a')
+
+    def test_values_are_copies(self):
+        """Изменение прочитанного объекта не портит кэш"""
+        self.first.set('key', [1])
+        self.first.get('key').append(2)
+        self.assertEqual(self.first.get('key'), [1])
+
+
+class SharedMemoryCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.cache = self.open()
+
+    def open(self, slots=64, slot_size=4096):
+        return SharedMemoryCache(
+            os.path.join(self.directory, f'cache-{slots}-{slot_size}'),
+            {'OPTIONS': {'SLOTS': slots, 'SLOT_SIZE': slot_size}}
+        )
+
+    def test_basic_operations(self):
+        """Запись, чтение, add, incr и удаление"""
+        self.cache.set('key', {'значение': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'значение': [1, 2]})
+        self.assertFalse(self.cache.add('key', 'другое'))
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertEqual(self.cache.incr('counter', 5), 6)
+        self.assertEqual(self.cache.get('counter'), 6)
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_expiry(self):
+        """Просроченная запись не читается"""
+        self.cache.set('key', 'значение', timeout=0)
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('key', 'значение', timeout=None)
+        self.assertEqual(self.cache.get('key'), 'значение')
+
+    def test_large_values_are_compressed_or_skipped(self):
+        """Большие значения сжимаются, не влезающие в слот не хранятся"""
+        page = '<p>Тестовый текст</p>' * 1000
+        self.cache.set('page', page)
+        self.assertEqual(self.cache.get('page'), page)
+        self.cache.set('noise', os.urandom(8192))
+        self.assertIsNone(self.cache.get('noise'))
+
+    def test_clock_keeps_hot_entries(self):
+        """CLOCK вытесняет записи, к которым не обращались"""
+        cache = self.open(slots=8)
+        cache.set('hot', 'значение')
+        for i in range(40):
+            cache.set(f'cold-{i}', i)
+            self.assertEqual(cache.get('hot'), 'значение')
+        present = [i for i in range(40) if cache.get(f'cold-{i}') is not None]
+        self.assertLess(len(present), 8)
+        self.assertIn(39, present)
+
+    def test_shared_between_processes(self):
+        """Запись другого процесса видна сразу"""
+        def child():
+            self.open().set('key', 'из другого процесса')
+            os._exit(0)
+
+        process = multiprocessing.get_context('fork').Process(target=child)
+        process.start()
+        process.join()
+        self.assertEqual(self.cache.get('key'), 'из другого процесса')
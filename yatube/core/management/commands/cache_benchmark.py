@@ -0,0 +1,100 @@
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.caching.backends.shared_memory import SharedMemoryCache
+
+
+def _shared_reads(cache, keys, index, processes, barrier, results):
+    # Every process fills its own share of the keys, then reads all of them
+    for key in keys[index::processes]:
+        cache.set(key, key)
+    barrier.wait()
+    hits = sum(cache.get(key) is not None for key in keys)
+    results.put(hits)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает SharedMemoryCache с LocMemCache и FileBasedCache: '
+            'скорость и общий для процессов кэш')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operations', type=int, default=20000)
+        parser.add_argument('--keys', type=int, default=500)
+        parser.add_argument(
+            '--value-size', type=int, default=10000,
+            help='Размер значения в байтах (отрендеренная страница)',
+        )
+        parser.add_argument('--processes', type=int, default=4)
+
+    def backends(self, directory):
+        return {
+            'LocMemCache': LocMemCache('benchmark', {}),
+            'FileBasedCache': FileBasedCache(
+                os.path.join(directory, 'files'), {}
+            ),
+            'SharedMemoryCache': SharedMemoryCache(
+                os.path.join(directory, 'shm'),
+                {'OPTIONS': {'SLOTS': 4096, 'SLOT_SIZE': 32768}},
+            ),
+        }
+
+    def throughput(self, cache, keys, value, operations):
+        started = time.perf_counter()
+        for i in range(operations):
+            cache.set(keys[i % len(keys)], value)
+        sets = operations / (time.perf_counter() - started)
+        picks = [random.choice(keys) for _ in range(operations)]
+        started = time.perf_counter()
+        for key in picks:
+            cache.get(key)
+        gets = operations / (time.perf_counter() - started)
+        return sets, gets
+
+    def hit_ratio(self, cache, keys, processes):
+        context = multiprocessing.get_context('fork')
+        barrier = context.Barrier(processes)
+        results = context.Queue()
+        workers = [
+            context.Process(
+                target=_shared_reads,
+                args=(cache, keys, index, processes, barrier, results),
+            ) for index in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        hits = sum(results.get() for _ in workers)
+        for worker in workers:
+            worker.join()
+        return hits / (len(keys) * processes)
+
+    def handle(self, *args, **options):
+        keys = [f'benchmark:{i}' for i in range(options['keys'])]
+        chunk = '<article><p>Тестовый текст поста</p></article>'
+        value = (chunk * (options['value_size'] // len(chunk) + 1))[
+            :options['value_size']
+        ]
+        directory = tempfile.mkdtemp()
+        try:
+            self.stdout.write(
+                f'{"backend":<20}{"set/s":>12}{"get/s":>12}'
+                f'{"hits x" + str(options["processes"]):>12}'
+            )
+            for name, cache in self.backends(directory).items():
+                sets, gets = self.throughput(
+                    cache, keys, value, options['operations']
+                )
+                cache.clear()
+                ratio = self.hit_ratio(cache, keys, options['processes'])
+                self.stdout.write(
+                    f'{name:<20}{sets:>12.0f}{gets:>12.0f}{ratio:>12.0%}'
+                )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
@@ -1,24 +1,89 @@
+from functools import reduce
+from operator import or_
+
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db.models import Q
 
+from . import search
+from .forms import PostAdminForm
 from .models import Comment, Follow, Group, Post
+from .paginators import EstimatedCountPaginator
 
+User = get_user_model()
+# Groups offered by the post list filter, the largest first
+GROUP_FILTER_CHOICES = 20
 
-class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'pub_date', 'author', 'group',)
-    list_editable = ('group', 'author',)
-    search_fields = ('pk', 'group', 'pub_date', 'author', 'text')
-    list_filter = ('group', 'pub_date', 'author',)
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список, который не сканирует таблицу ради подсчета и поиска.
+
+    Число строк без фильтров оценивается (EstimatedCountPaginator), поиск
+    идет только по индексам: число - первичный ключ, остальное - точное
+    имя пользователя в полях user_search_fields.
+    """
+    paginator = EstimatedCountPaginator
+    # The "N total" link next to the search box is one more COUNT(*)
+    show_full_result_count = False
+    user_search_fields = ()
     empty_value_display = '-пусто-'
 
+    def search_filter(self, term):
+        users = User.objects.filter(username=term).values('pk')
+        return reduce(or_, (
+            Q(**{f'{field}__in': users}) for field in self.user_search_fields
+        ))
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(pk=term), False
+        return queryset.filter(self.search_filter(term)), False
+
+
+class PopularGroupFilter(admin.SimpleListFilter):
+    """Фильтр по группе без выборки всех групп."""
+    title = 'группа'
+    parameter_name = 'group'
+
+    def lookups(self, request, model_admin):
+        return Group.objects.order_by('-post_count').values_list(
+            'pk', 'title'
+        )[:GROUP_FILTER_CHOICES]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(group=self.value())
+        return queryset
+
+
+class PostAdmin(LargeTableAdmin):
+    # New images are downscaled and described like uploads on the site
+    form = PostAdminForm
+    list_display = ('pk', 'text', 'pub_date', 'author', 'group',)
+    list_select_related = ('author', 'group',)
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('group',)
+    # Texts are matched by the search index, see search_filter
+    search_fields = ('text', '=author__username',)
+    user_search_fields = ('author',)
+    list_filter = (PopularGroupFilter, 'pub_date',)
+    date_hierarchy = 'pub_date'
+
+    def search_filter(self, term):
+        return super().search_filter(term) | Q(pk__in=search.post_ids(term))
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description',)
-    search_fields = ('pk', 'title', 'slug',)
-    list_filter = ('title', 'slug',)
+    # Also serves the group autocomplete of posts
+    search_fields = ('title', 'slug',)
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = (
         'pk',
         'text',
@@ -27,16 +92,20 @@ class CommentAdmin(admin.ModelAdmin):
         'created',
         'edited',
     )
-    search_fields = ('pk', 'author', 'created', 'edited',)
-    list_filter = ('author', 'created', 'edited',)
-    empty_value_display = '-пусто-'
+    list_select_related = ('author', 'post',)
+    raw_id_fields = ('author', 'post',)
+    search_fields = ('=author__username',)
+    user_search_fields = ('author',)
+    list_filter = ('created',)
+    date_hierarchy = 'created'
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     list_display = ('pk', 'author', 'user',)
-    search_fields = ('pk', 'author', 'user',)
-    list_filter = ('author', 'user',)
-    empty_value_display = '-пусто-'
+    list_select_related = ('author', 'user',)
+    raw_id_fields = ('author', 'user',)
+    search_fields = ('=author__username', '=user__username',)
+    user_search_fields = ('author', 'user',)
 
 
 admin.site.register(Post, PostAdmin)
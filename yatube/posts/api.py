@@ -0,0 +1,242 @@
+"""Легкий JSON API только для чтения: те же ленты и пост, что в views.
+
+Ответ собирается из values() только по запрошенным полям (?fields=a,b),
+без моделей и шаблонов. Ленты листаются курсором (?after=/?before=, см.
+CursorPaginator) без COUNT(*); ?limit= задает размер страницы. Ленты
+кэшируются и отвечают 304 так же, как HTML-страницы (cache_feed), пост -
+по ETag страницы поста.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.views.decorators.http import condition, require_safe
+
+from .conditional import post_etag, post_last_modified
+from .feed_cache import (cache_feed, follow_scopes, group_scopes,
+                         index_scopes, profile_scopes)
+from .models import Comment, Group, Post
+from .paginators import FEED_KEYS, CursorPaginator, InvalidCursor
+from .timeline import FollowFeed
+from .views import COMMENT_KEYS
+
+DEFAULT_LIMIT = settings.POSTS_PER_PAGE
+MAX_LIMIT = settings.API_MAX_LIMIT
+User = get_user_model()
+
+
+def _image_url(name):
+    return Post._meta.get_field('image').storage.url(name) if name else None
+
+
+# API field -> values() lookup
+POST_FIELDS = {
+    'id': 'id',
+    'header': 'header',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'edited': 'edited',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'image_width': 'image_width',
+    'image_height': 'image_height',
+    'image_placeholder': 'image_placeholder',
+    'comment_count': 'comment_count',
+}
+POST_DEFAULT_FIELDS = (
+    'id', 'header', 'text', 'pub_date', 'edited', 'author', 'group',
+    'image', 'comment_count',
+)
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'author': 'author__username',
+    'created': 'created',
+    'edited': 'edited',
+}
+CONVERTERS = {'image': _image_url}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _response(data, status=200):
+    return JsonResponse(
+        data, status=status, encoder=DjangoJSONEncoder,
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+def _error(message, status):
+    return _response({'detail': message}, status)
+
+
+def _fields(request, available, default):
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(default)
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown or not names:
+        raise BadRequest(f'Неизвестные поля: {", ".join(unknown)}')
+    return names
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise BadRequest('limit должен быть числом')
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def _rows(queryset, available, names, keys=()):
+    """Выборка только нужных столбцов и ключей курсора."""
+    lookups = {available[name] for name in names}
+    return queryset.values(*lookups | set(keys))
+
+
+def _serialize(row, available, names):
+    data = {}
+    for name in names:
+        value = row[available[name]]
+        convert = CONVERTERS.get(name)
+        data[name] = convert(value) if convert else value
+    return data
+
+
+def _page_url(request, **params):
+    query = request.GET.copy()
+    for key in ('after', 'before'):
+        query.pop(key, None)
+    query.update(params)
+    return f'{request.path}?{query.urlencode()}'
+
+
+def _cursor_page(request, rows, keys, available, names):
+    paginator = CursorPaginator(rows, _limit(request), keys)
+    try:
+        page = paginator.page(
+            request.GET.get('after'), request.GET.get('before')
+        )
+    except (InvalidCursor, ValidationError, ValueError):
+        raise BadRequest('Неверный курсор')
+    return {
+        'results': [_serialize(row, available, names) for row in page],
+        'next': page.next_cursor and _page_url(
+            request, after=page.next_cursor
+        ),
+        'previous': page.previous_cursor and _page_url(
+            request, before=page.previous_cursor
+        ),
+    }
+
+
+def api_view(view):
+    """GET и HEAD; неверные параметры - 400 с описанием в JSON."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as error:
+            return _error(str(error), 400)
+    return wrapper
+
+
+def _post_feed(request, posts, **extra):
+    names = _fields(request, POST_FIELDS, POST_DEFAULT_FIELDS)
+    rows = _rows(posts, POST_FIELDS, names, FEED_KEYS)
+    data = _cursor_page(request, rows, FEED_KEYS, POST_FIELDS, names)
+    return _response({**extra, **data})
+
+
+# Main Page
+@api_view
+@cache_feed(index_scopes)
+def index(request):
+    return _post_feed(request, Post.objects.all())
+
+
+# Group Posts
+@api_view
+@cache_feed(group_scopes)
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).values(
+        'pk', 'title', 'slug', 'description', 'post_count'
+    ).first()
+    if group is None:
+        return _error('Группа не найдена', 404)
+    group_id = group.pop('pk')
+    return _post_feed(
+        request, Post.objects.filter(group_id=group_id), group=group
+    )
+
+
+# Profile
+@api_view
+@cache_feed(profile_scopes)
+def profile(request, username):
+    author = User.objects.filter(
+        username=username
+    ).values(
+        'pk', 'username', 'first_name', 'last_name', 'stats__post_count',
+        'stats__follower_count', 'stats__following_count',
+    ).first()
+    if author is None:
+        return _error('Пользователь не найден', 404)
+    author_id = author.pop('pk')
+    for counter in ('post_count', 'follower_count', 'following_count'):
+        author[counter] = author.pop(f'stats__{counter}')
+    return _post_feed(
+        request, Post.objects.filter(author_id=author_id), author=author
+    )
+
+
+# Author's Posts
+@api_view
+@cache_feed(follow_scopes)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return _error('Нужна авторизация', 401)
+    names = _fields(request, POST_FIELDS, POST_DEFAULT_FIELDS)
+    feed = FollowFeed(
+        request.user,
+        posts=_rows(Post.objects.all(), POST_FIELDS, names, FEED_KEYS),
+    )
+    return _response(
+        _cursor_page(request, feed, FEED_KEYS, POST_FIELDS, names)
+    )
+
+
+# Post Details
+@api_view
+@condition(etag_func=post_etag, last_modified_func=post_last_modified)
+def post_detail(request, post_id):
+    names = _fields(request, POST_FIELDS, POST_DEFAULT_FIELDS)
+    row = _rows(
+        Post.objects.filter(pk=post_id), POST_FIELDS, names
+    ).first()
+    if row is None:
+        return _error('Пост не найден', 404)
+    return _response(_serialize(row, POST_FIELDS, names))
+
+
+# Post Comments
+@api_view
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return _error('Пост не найден', 404)
+    names = _fields(request, COMMENT_FIELDS, COMMENT_FIELDS)
+    rows = _rows(
+        Comment.objects.filter(post_id=post_id), COMMENT_FIELDS, names,
+        COMMENT_KEYS
+    )
+    return _response(
+        _cursor_page(request, rows, COMMENT_KEYS, COMMENT_FIELDS, names)
+    )
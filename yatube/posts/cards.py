@@ -0,0 +1,56 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import thumbnails
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+CARD_TIMEOUT = settings.POST_CARD_TIMEOUT
+
+
+def card_version(post):
+    """Версия карточки: меняется вместе со всем, что карточка выводит.
+
+    Правка поста обновляет edited, переименование автора меняет его имя,
+    готовые миниатюры сменяют заглушку, так что старые версии просто
+    перестают читаться и истекают сами.
+    """
+    author = post.author
+    parts = (
+        post.edited.isoformat() if post.edited else '',
+        post.header,
+        post.text,
+        post.image.name or '',
+        'ready' if getattr(post, 'thumbnails_ready', False) else '',
+        author.username,
+        author.get_full_name(),
+    )
+    raw = '\0'.join(parts).encode()
+    return hashlib.md5(raw).hexdigest()
+
+
+def card_key(post):
+    return f'post_card:{post.pk}:{card_version(post)}'
+
+
+def attach_cards(posts):
+    """Кладет в post.card готовый HTML карточки, недостающие рендерит.
+
+    Кэш читается и пополняется одним запросом на страницу; части,
+    зависящие от пользователя, рендерятся вокруг карточки в for_post.html.
+    """
+    thumbnails.attach_pictures(posts)
+    keys = {card_key(post): post for post in posts}
+    cards = cache.get_many(keys)
+    missing = {}
+    for key, post in keys.items():
+        if key not in cards:
+            missing[key] = render_to_string(CARD_TEMPLATE, {'post': post})
+    if missing:
+        cache.set_many(missing, CARD_TIMEOUT)
+        cards.update(missing)
+    for key, post in keys.items():
+        post.card = mark_safe(cards[key])
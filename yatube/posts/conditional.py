@@ -0,0 +1,58 @@
+import hashlib
+
+from django.db.models import OuterRef, Subquery
+
+from . import feed_cache, thumbnails
+from .models import Comment, Post
+
+
+def _post_state(request, post_id):
+    """Все, от чего зависит страница поста, одним запросом по индексам.
+
+    Каждый столбец, который выводит страница, входит сюда; правки
+    комментариев и имена их авторов - через поколения в кэше.
+    """
+    if not hasattr(request, '_post_state'):
+        latest_comment = Comment.objects.filter(
+            post=OuterRef('pk')
+        ).order_by('-created').values('created')[:1]
+        request._post_state = Post.objects.filter(pk=post_id).annotate(
+            latest_comment=Subquery(latest_comment)
+        ).values(
+            'header', 'text', 'image', 'image_placeholder', 'pub_date',
+            'edited', 'comment_count',
+            'latest_comment', 'group__title', 'group__slug',
+            'author__username', 'author__first_name', 'author__last_name',
+            'author__stats__post_count', 'thumbnails_version',
+        ).first()
+        if request._post_state is not None:
+            state = request._post_state
+            state['thumbnails_ready'] = thumbnails.is_ready(
+                state['image'], state.pop('thumbnails_version')
+            )
+            state['generations'] = feed_cache.generations(
+                feed_cache.post_page_scopes(post_id)
+            )
+    return request._post_state
+
+
+def post_etag(request, post_id):
+    state = _post_state(request, post_id)
+    if state is None:
+        return None
+    # The page shows the edit button and comment form to this viewer only
+    viewer = request.user.pk if request.user.is_authenticated else 'anon'
+    raw = '|'.join(
+        str(value) for value in (
+            *sorted(state.items()), viewer, request.get_full_path()
+        )
+    )
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def post_last_modified(request, post_id):
+    state = _post_state(request, post_id)
+    if state is None:
+        return None
+    moments = (state['pub_date'], state['edited'], state['latest_comment'])
+    return max(moment for moment in moments if moment is not None)
@@ -0,0 +1,72 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Group, Post, UserStats
+
+# (model, counter field, counted model, its foreign key to the model)
+COUNTERS = (
+    (Post, 'comment_count', Comment, 'post'),
+    (Group, 'post_count', Post, 'group'),
+    (UserStats, 'post_count', Post, 'author'),
+    (UserStats, 'follower_count', Follow, 'author'),
+    (UserStats, 'following_count', Follow, 'user'),
+)
+
+
+def _count(model, field):
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+        field
+    ).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def real_counts(model):
+    """Выражения, которые честно пересчитывают счетчики модели."""
+    return {
+        field: _count(counted, fk)
+        for owner, field, counted, fk in COUNTERS if owner is model
+    }
+
+
+def change(model, pk, **deltas):
+    """Атомарно сдвигает счетчики строки; возвращает число строк."""
+    if pk is None:
+        return 0
+    values = {}
+    for field, delta in deltas.items():
+        # A drifted counter must not trip the CHECK (x >= 0) constraint
+        values[field] = F(field) + delta if delta > 0 else Greatest(
+            F(field) + delta, 0
+        )
+    return model.objects.filter(pk=pk).update(**values)
+
+
+def change_user(user_id, **deltas):
+    if change(UserStats, user_id, **deltas):
+        return
+    if all(delta > 0 for delta in deltas.values()):
+        # Users created before the counters (or via bulk_create) get their
+        # row on the first increment. Decrements of a missing row mostly
+        # come from a cascading user delete and are left alone
+        ensure_user_stats([user_id])
+        reconcile(UserStats, [user_id])
+
+
+def ensure_user_stats(user_ids):
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk) for pk in user_ids), ignore_conflicts=True
+    )
+
+
+def reconcile(model, pks):
+    """Пересчитывает счетчики строк `pks`, возвращает число исправленных."""
+    counts = real_counts(model)
+    in_sync = Q(**{field: F(f'real_{field}') for field in counts})
+    drifted = list(
+        model.objects.filter(pk__in=pks).annotate(
+            **{f'real_{field}': count for field, count in counts.items()}
+        ).exclude(in_sync).values_list('pk', flat=True)
+    )
+    if drifted:
+        model.objects.filter(pk__in=drifted).update(**counts)
+    return len(drifted)
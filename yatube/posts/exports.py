@@ -0,0 +1,142 @@
+"""Потоковая выгрузка постов, комментариев и подписок в JSONL или CSV.
+
+Таблица читается окнами по первичному ключу (WHERE id > последний LIMIT
+EXPORT_BATCH_SIZE), каждое окно - через iterator() без кэша выборки, так
+что ни один запрос не держит курсор на всю таблицу, а память не зависит
+от числа строк. Столбцы совпадают с форматом posts.imports: выгрузку
+можно загрузить обратно командой import_data.
+"""
+import csv
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Follow, Post
+
+BATCH_SIZE = settings.EXPORT_BATCH_SIZE
+CHUNK_SIZE = settings.EXPORT_CHUNK_SIZE
+# Encoded lines are handed out (and compressed) in pieces of about this size
+BUFFER_SIZE = 64 * 1024
+# zlib writes a gzip header and trailer with this window
+GZIP_WBITS = zlib.MAX_WBITS | 16
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+# Output column -> lookup; the first one is the primary key
+EXPORTS = {
+    'posts': (Post, {
+        'id': 'id',
+        'text': 'text',
+        'header': 'header',
+        'pub_date': 'pub_date',
+        'edited': 'edited',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+    }),
+    'comments': (Comment, {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+        'edited': 'edited',
+    }),
+    'follows': (Follow, {
+        'id': 'id',
+        'user': 'user__username',
+        'author': 'author__username',
+    }),
+}
+
+
+def columns(kind):
+    return list(EXPORTS[kind][1])
+
+
+def records(kind, batch_size=BATCH_SIZE):
+    """Строки таблицы кортежами значений столбцов, по возрастанию id."""
+    model, lookups = EXPORTS[kind]
+    last_pk = 0
+    while True:
+        rows = model.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+            *lookups.values()
+        )[:batch_size]
+        read = 0
+        for row in rows.iterator(chunk_size=CHUNK_SIZE):
+            read += 1
+            yield row
+        if read < batch_size:
+            return
+        last_pk = row[0]
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class _Echo:
+    # csv.writer "file" that hands back the formatted line
+    def write(self, value):
+        return value
+
+
+def jsonl_lines(names, rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(names, row))) + '\n'
+
+
+def csv_lines(names, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(names)
+    for row in rows:
+        yield writer.writerow([_cell(value) for value in row])
+
+
+LINES = {'jsonl': jsonl_lines, 'csv': csv_lines}
+
+
+def _buffered(lines):
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream(kind, file_format, compress=False, rows=None):
+    """Выгрузка кусками байтов, по желанию сжатая gzip на лету.
+
+    rows - строки вместо records(kind), например с подсчетом.
+    """
+    if rows is None:
+        rows = records(kind)
+    lines = LINES[file_format](columns(kind), rows)
+    compressor = zlib.compressobj(wbits=GZIP_WBITS) if compress else None
+    for text in _buffered(lines):
+        data = text.encode()
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            yield data
+    if compressor is not None:
+        yield compressor.flush()
+
+
+def filename(kind, file_format, compress=False):
+    return f'{kind}.{file_format}' + ('.gz' if compress else '')
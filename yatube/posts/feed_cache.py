@@ -0,0 +1,169 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from core.caching.stampede import get_or_compute
+
+from .models import Follow, Group
+
+PAGE_TIMEOUT = settings.FEED_PAGE_TIMEOUT
+# Group edits and author renames show up on every feed page
+EVERYTHING = ('all',)
+
+
+def _generation_key(scope):
+    return 'feed_gen:' + ':'.join(str(part) for part in scope)
+
+
+def _following_key(user_id):
+    return f'feed_following_ids:{user_id}'
+
+
+def _fresh_generation():
+    # A generation evicted from the cache must not restart from a value
+    # that older cached pages were stored under
+    return time.time_ns()
+
+
+def generations(scopes):
+    """Текущие поколения областей; недостающие заводятся заново."""
+    keys = [_generation_key(scope) for scope in scopes]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, _fresh_generation(), None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def bump(*scopes):
+    """Сдвигает поколения областей: закэшированные страницы устаревают."""
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_generation(), None)
+
+
+def post_scopes(post, group_ids=()):
+    """Области всех лент, в которых виден пост.
+
+    Профиль - по имени автора из адреса страницы, ленты подписок - по pk
+    автора: имя меняется, а список подписок закэширован.
+    """
+    scopes = [
+        ('index',),
+        ('profile', post.author.username),
+        ('author', post.author_id),
+    ]
+    group_ids = {post.group_id, *group_ids} - {None}
+    if group_ids:
+        slugs = Group.objects.filter(pk__in=group_ids).values_list(
+            'slug', flat=True
+        )
+        scopes.extend(('group', slug) for slug in slugs)
+    return scopes
+
+
+def post_page_scopes(post_id):
+    """Области страницы поста, которых нет в ее строке таблицы.
+
+    Комментарии меняются без правки поста, имена их авторов - вместе
+    с EVERYTHING.
+    """
+    return [EVERYTHING, ('comments', post_id)]
+
+
+def forget_following(user_id):
+    cache.delete(_following_key(user_id))
+
+
+def following_ids(user):
+    key = _following_key(user.pk)
+    author_ids = cache.get(key)
+    if author_ids is None:
+        author_ids = list(
+            Follow.objects.filter(user=user).values_list(
+                'author_id', flat=True
+            )
+        )
+        cache.set(key, author_ids, PAGE_TIMEOUT)
+    return author_ids
+
+
+def page_key(request, scopes):
+    viewer = request.user.pk if request.user.is_authenticated else 'anon'
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    versions = '.'.join(str(value) for value in generations(scopes))
+    digest = hashlib.md5(versions.encode()).hexdigest()
+    return f'feed_page:{viewer}:{path}:{digest}'
+
+
+def _cacheable(request, response):
+    # Never replay another visitor's cookies or CSRF token
+    personal = response.cookies or request.META.get('CSRF_COOKIE_USED')
+    return response.status_code == 200 and not personal
+
+
+def cache_feed(dependencies):
+    """Кэширует страницу ленты до изменения ее областей.
+
+    `dependencies(request, *args, **kwargs)` перечисляет области, от
+    которых зависит страница; сигналы моделей сдвигают их поколения, и
+    ключ страницы меняется сразу, без ожидания TTL. Страница кэшируется
+    отдельно для каждого пользователя и одна на всех анонимов; пересчет
+    защищен от stampede (см. core.caching.stampede). На If-None-Match с
+    тем же ключом отвечает 304.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            scopes = [EVERYTHING, *dependencies(request, *args, **kwargs)]
+            key = page_key(request, scopes)
+            # The key already names the exact version of the page, so it
+            # doubles as the ETag: a repeat visit costs no queries at all
+            etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return not_modified
+            response = get_or_compute(
+                key,
+                lambda: view(request, *args, **kwargs),
+                PAGE_TIMEOUT,
+                should_cache=lambda response: _cacheable(request, response),
+            )
+            if response.status_code == 200:
+                response['ETag'] = etag
+            return response
+        return wrapper
+    return decorator
+
+
+def index_scopes(request):
+    return [('index',)]
+
+
+def group_scopes(request, slug):
+    return [('group', slug)]
+
+
+def profile_scopes(request, username):
+    return [('profile', username)]
+
+
+def follow_scopes(request):
+    if not request.user.is_authenticated:
+        return []
+    scopes = [('follow', request.user.pk)]
+    scopes.extend(
+        ('author', author_id) for author_id in following_ids(request.user)
+    )
+    return scopes
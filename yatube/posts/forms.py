@@ -1,14 +1,39 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
 from .models import Comment, Post
+from .uploads import empty_metadata, process_image
 
 
-class PostForm(forms.ModelForm):
+class ProcessedImageMixin:
+    """Новая картинка уменьшается и описывается полями Post.image_*."""
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        # Only a fresh upload is processed, not the already stored file
+        if isinstance(image, UploadedFile):
+            image, metadata = process_image(image)
+        elif not image:
+            metadata = empty_metadata()
+        else:
+            return image
+        for field, value in metadata.items():
+            setattr(self.instance, field, value)
+        return image
+
+
+class PostForm(ProcessedImageMixin, forms.ModelForm):
     class Meta:
         model = Post
         fields = ("text", "group", "image", )
 
 
+class PostAdminForm(ProcessedImageMixin, forms.ModelForm):
+    class Meta:
+        model = Post
+        fields = '__all__'
+
+
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
@@ -0,0 +1,67 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exports
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты, комментарии или подписки в JSONL или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(exports.EXPORTS))
+        parser.add_argument(
+            'path', help='Файл .jsonl, .csv, с .gz на конце - сжатый; - вывод'
+        )
+        parser.add_argument(
+            '--format',
+            choices=exports.FORMATS,
+            help='Формат файла, по умолчанию по расширению',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжать gzip, по умолчанию для файлов .gz',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=exports.BATCH_SIZE,
+            help='Сколько строк читать одним запросом',
+        )
+
+    def file_options(self, options):
+        parts = options['path'].lower().split('.')
+        compress = options['gzip'] or parts[-1] == 'gz'
+        if parts[-1] == 'gz':
+            parts.pop()
+        file_format = options['format'] or parts[-1]
+        if file_format not in exports.FORMATS:
+            raise CommandError(f'Неизвестный формат файла: {file_format}')
+        return file_format, compress
+
+    def counted(self, rows):
+        for row in rows:
+            self.done += 1
+            yield row
+
+    def handle(self, *args, **options):
+        file_format, compress = self.file_options(options)
+        kind = options['kind']
+        self.done = 0
+        started = time.monotonic()
+        rows = self.counted(exports.records(kind, options['batch_size']))
+        chunks = exports.stream(kind, file_format, compress, rows)
+        if options['path'] == '-':
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            return
+        with open(options['path'], 'wb') as file:
+            for chunk in chunks:
+                file.write(chunk)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{kind}: выгружено строк {self.done}; {elapsed:.1f} с, '
+            f'{self.done / max(elapsed, 0.001):.0f} строк/с'
+        ))
@@ -0,0 +1,40 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+from posts.uploads import read_metadata
+
+
+class Command(BaseCommand):
+    help = ('Создает миниатюры и метаданные для уже загруженных '
+            'изображений, например после изменения THUMBNAIL_WIDTHS')
+
+    def images(self, posts):
+        return posts.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct().iterator()
+
+    def fill_metadata(self, name):
+        with default_storage.open(name) as file:
+            metadata = read_metadata(file)
+        Post.objects.filter(image=name).update(**metadata)
+
+    def handle(self, *args, **options):
+        done = 0
+        for name in self.images(Post.objects.filter(image_hash='')):
+            try:
+                self.fill_metadata(name)
+            except Exception as error:
+                self.stderr.write(f'{name}: {error}')
+        # Images whose thumbnails match the current variants are skipped
+        for name in self.images(Post.objects.exclude(
+            thumbnails_version=thumbnails.SPECS_VERSION
+        )):
+            try:
+                thumbnails.generate(name)
+            except Exception as error:
+                self.stderr.write(f'{name}: {error}')
+            else:
+                done += 1
+        self.stdout.write(f'Изображений обработано: {done}')
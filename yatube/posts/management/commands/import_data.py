@@ -0,0 +1,110 @@
+import os
+import time
+from itertools import islice
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection
+
+from posts import feed_cache
+from posts.imports import FORMATS, IMPORTERS, batches, read_rows
+
+
+class Command(BaseCommand):
+    help = ('Загружает пользователей, группы, посты, комментарии или '
+            'подписки из JSONL или CSV')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path', help='Файл .jsonl или .csv')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат файла, по умолчанию по расширению',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк вставлять в одной транзакции',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Пропустить строки, загруженные прошлым запуском',
+        )
+        parser.add_argument(
+            '--no-rebuild',
+            action='store_true',
+            help=('Не пересобирать счетчики, поиск, ленты и миниатюры, '
+                  'например до загрузки следующего файла'),
+        )
+
+    def file_format(self, options):
+        file_format = options['format'] or os.path.splitext(
+            options['path']
+        )[1].lstrip('.').lower()
+        if file_format not in FORMATS:
+            raise CommandError(f'Неизвестный формат файла: {file_format}')
+        return file_format
+
+    def read_progress(self, progress_path):
+        try:
+            with open(progress_path) as progress:
+                return int(progress.read())
+        except FileNotFoundError:
+            return 0
+
+    def write_progress(self, progress_path, done):
+        # A crash while writing must not leave a truncated checkpoint
+        with open(progress_path + '.tmp', 'w') as progress:
+            progress.write(str(done))
+        os.replace(progress_path + '.tmp', progress_path)
+
+    def reset_sequences(self, model):
+        # Rows keep their archive ids, new rows must number after them
+        statements = connection.ops.sequence_reset_sql(no_style(), [model])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def handle(self, *args, **options):
+        importer = IMPORTERS[options['kind']]()
+        file_format = self.file_format(options)
+        progress_path = options['path'] + '.progress'
+        done = self.read_progress(progress_path) if options['resume'] else 0
+        resumed_at = done
+        loaded = 0
+        started = time.monotonic()
+        with open(options['path'], newline='', encoding='utf-8') as file:
+            rows = islice(read_rows(file, file_format), done, None)
+            try:
+                for batch in batches(rows, options['batch_size']):
+                    loaded += importer.load(batch)
+                    done += len(batch)
+                    # Only committed batches count as done
+                    self.write_progress(progress_path, done)
+                    if options['verbosity'] >= 2:
+                        self.stdout.write(f'Обработано строк: {done}')
+            except (KeyError, ValueError) as error:
+                raise CommandError(
+                    f'Ошибка в пачке после строки {done}: {error!r}. '
+                    f'Загруженное сохранено, продолжить можно с --resume'
+                )
+        elapsed = time.monotonic() - started
+        self.reset_sequences(importer.model)
+        processed = done - resumed_at
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["kind"]}: обработано строк {processed}, загружено '
+            f'{loaded}, без найденных ссылок {processed - loaded}; '
+            f'{elapsed:.1f} с, {processed / max(elapsed, 0.001):.0f} строк/с'
+        ))
+        if options['no_rebuild']:
+            return
+        for command in importer.rebuild:
+            call_command(
+                command, verbosity=options['verbosity'],
+                stdout=self.stdout, stderr=self.stderr,
+            )
+        feed_cache.bump(feed_cache.EVERYTHING)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает поисковый индекс постов с нуля'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько постов индексировать в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        backend = search.backend()
+        backend.clear()
+        last_pk = 0
+        done = 0
+        while True:
+            posts = list(
+                Post.objects.filter(pk__gt=last_pk).order_by('pk').only(
+                    'header', 'text'
+                )[:options['batch_size']]
+            )
+            if not posts:
+                break
+            with transaction.atomic():
+                backend.index(posts)
+            done += len(posts)
+            last_pk = posts[-1].pk
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'Проиндексировано постов: {done}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{type(backend).__name__}: проиндексировано постов {done}'
+        ))
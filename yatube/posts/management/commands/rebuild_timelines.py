@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import feed_cache, timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок с нуля'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.TIMELINE_BATCH_SIZE,
+            help='Сколько пользователей обрабатывать в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = 0
+        done = 0
+        while True:
+            user_ids = list(
+                User.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                    'pk', flat=True
+                )[:batch_size]
+            )
+            if not user_ids:
+                break
+            with transaction.atomic():
+                timeline.rebuild(user_ids)
+            feed_cache.bump(*(('follow', pk) for pk in user_ids))
+            last_pk = user_ids[-1]
+            done += len(user_ids)
+            if options['verbosity'] >= 1:
+                self.stdout.write(f'Обработано пользователей: {done}')
+        self.stdout.write(self.style.SUCCESS('Ленты пересобраны'))
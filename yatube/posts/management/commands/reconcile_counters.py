@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import counters
+from posts.models import Group, Post, UserStats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счетчики и чинит расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк пересчитывать за один запрос',
+        )
+
+    def batches(self, queryset, batch_size):
+        last_pk = 0
+        while True:
+            pks = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk').values_list(
+                    'pk', flat=True
+                )[:batch_size]
+            )
+            if not pks:
+                return
+            yield pks
+            last_pk = pks[-1]
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for pks in self.batches(User.objects.all(), batch_size):
+            counters.ensure_user_stats(pks)
+        for model in (UserStats, Group, Post):
+            repaired = 0
+            for pks in self.batches(model.objects.all(), batch_size):
+                repaired += counters.reconcile(model, pks)
+            if options['verbosity'] >= 1:
+                self.stdout.write(
+                    f'{model.__name__}: исправлено {repaired}'
+                )
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны'))
@@ -0,0 +1,68 @@
+import logging
+import posixpath
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post
+from .uploads import empty_metadata, read_metadata
+
+logger = logging.getLogger(__name__)
+
+
+def _delete_unreferenced(name):
+    if Post.objects.filter(image=name).exists():
+        return
+    storage = Post._meta.get_field('image').storage
+    # Removes the source file and every thumbnail sorl has recorded for it
+    try:
+        default.backend.delete(ImageFile(name, storage))
+    except (OSError, SuspiciousFileOperation):
+        # A leftover file must not fail the request that freed it
+        logger.exception('Не удалось удалить картинку %s', name)
+
+
+def _stored_hash(name):
+    # Stored names are the sha256 of the content, see posts.storage
+    return posixpath.splitext(posixpath.basename(name))[0]
+
+
+def refresh_metadata(post):
+    """Приводит поля Post.image_* в соответствие с сохраненным файлом.
+
+    Форма заполняет их сама, и тогда файл не открывается; картинка,
+    замененная в обход формы, читается заново.
+    """
+    name = post.image.name
+    if not name:
+        if not post.image_hash:
+            return
+        metadata = empty_metadata()
+    elif post.image_hash == _stored_hash(name):
+        return
+    else:
+        try:
+            with post.image.storage.open(name) as file:
+                metadata = read_metadata(file)
+        except (OSError, SyntaxError, Image.DecompressionBombError,
+                SuspiciousFileOperation):
+            logger.exception('Не удалось прочитать картинку %s', name)
+            metadata = empty_metadata()
+    Post.objects.filter(pk=post.pk).update(**metadata)
+    for field, value in metadata.items():
+        setattr(post, field, value)
+
+
+def release(name):
+    """Удаляет файл картинки, когда на него не ссылается ни один пост.
+
+    Файлы общие для постов с одинаковыми картинками, так что ссылки
+    считаются по таблице постов после коммита. Гонка остается только
+    между удалением последнего поста с картинкой и загрузкой тех же
+    байтов в тот же момент.
+    """
+    if name:
+        transaction.on_commit(lambda: _delete_unreferenced(name))
@@ -0,0 +1,49 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:44
+
+from django.db import OperationalError, migrations, models
+import django.db.models.deletion
+
+
+def create_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE posts_post_fts USING fts5(header, text)'
+        )
+    except OperationalError:
+        # SQLite built without FTS5: posts.search uses SearchTerm instead
+        return
+    schema_editor.execute(
+        'INSERT INTO posts_post_fts (rowid, header, text) '
+        'SELECT id, header, text FROM posts_post'
+    )
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='search_term_unique_post'),
+        ),
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
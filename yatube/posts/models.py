@@ -1,20 +1,44 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 ABRIDGE_BY = 35
 
 
-class Group(models.Model):
+class CounterFieldsMixin:
+    """Обычный save() не перезаписывает счетчики устаревшими значениями.
+
+    Счетчики меняются только атомарным UPDATE ... SET x = x + 1, а
+    экземпляр, прочитанный до этого, хранит старое значение. Так же
+    защищены поля, которые пишет фоновая задача.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class Group(CounterFieldsMixin, models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=30, unique=True)
     description = models.TextField()
+    post_count = models.PositiveIntegerField(default=0, editable=False)
+
+    counter_fields = ('post_count',)
 
     def __str__(self):
         return self.title
 
 
-class Post(models.Model):
+class Post(CounterFieldsMixin, models.Model):
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст нового поста',
@@ -44,13 +68,48 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        storage=ContentAddressedStorage(),
+        blank=True,
+        # Files are shared between posts and counted by this column
+        db_index=True,
+    )
+    # Filled from the decoded upload, so rendering never opens the file
+    image_width = models.PositiveIntegerField(
+        blank=True, null=True, editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        blank=True, null=True, editable=False
     )
+    image_hash = models.CharField(max_length=64, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # thumbnails.SPECS_VERSION of the generated thumbnails, empty until then
+    thumbnails_version = models.CharField(
+        max_length=8, blank=True, editable=False
+    )
+
+    # thumbnails_version is set in the background, see thumbnails.generate
+    counter_fields = ('comment_count', 'thumbnails_version')
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # One index per feed, in the feed's (-pub_date, -id) order
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_feed_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_feed_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_feed_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:ABRIDGE_BY]
@@ -77,6 +136,17 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_idx'
+            ),
+            # The admin list and its date hierarchy
+            models.Index(
+                fields=['-created', '-id'],
+                name='comment_created_idx'
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -92,7 +162,83 @@ class Follow(models.Model):
     )
 
     class Meta:
-        models.UniqueConstraint(
-            fields=['user', 'author'],
-            name='follow_together_constraint'
-        )
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='follow_together_constraint'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Счетчики пользователя, которые иначе считались бы на каждый просмотр."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    post_count = models.PositiveIntegerField(default=0)
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: по строке на пост и подписчика."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    # Copy of post.pub_date, so the feed is a range scan over one index
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='timeline_unique_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_feed_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_author_idx'
+            ),
+        ]
+
+
+class SearchTerm(models.Model):
+    """Запасной обратный индекс поиска для баз без FTS5, см. posts.search."""
+    TERM_LENGTH = 64
+
+    term = models.CharField(max_length=TERM_LENGTH)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    # Occurrences of the term, header ones count SEARCH_HEADER_WEIGHT times
+    weight = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'],
+                name='search_term_unique_post'
+            ),
+        ]
@@ -0,0 +1,316 @@
+import base64
+import binascii
+from collections.abc import Sequence
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+MAX_OFFSET_PAGES = settings.MAX_OFFSET_PAGES
+COUNT_TIMEOUT = settings.FEED_COUNT_TIMEOUT
+COUNT_ESTIMATE_THRESHOLD = settings.COUNT_ESTIMATE_THRESHOLD
+# Feeds are sorted newest first, the primary key breaks pub_date ties
+FEED_KEYS = ('pub_date', 'pk')
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(obj, keys=FEED_KEYS):
+    """Упаковывает значения ключей объекта в непрозрачный токен."""
+    values = []
+    for key in keys:
+        # Rows of values() querysets are dicts
+        value = obj[key] if isinstance(obj, dict) else getattr(obj, key)
+        values.append(
+            value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        )
+    raw = '|'.join(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, keys=FEED_KEYS):
+    """Распаковывает токен обратно в значения ключей."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = base64.urlsafe_b64decode(padded.encode()).decode()
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursor(token)
+    values = values.split('|')
+    if len(values) != len(keys) or not all(values):
+        raise InvalidCursor(token)
+    return values
+
+
+def keyset_filter(keys, values, older=True):
+    """Условие "строго после курсора" для сортировки по убыванию ключей.
+
+    Сравнение кортежей раскрывается в OR по ключам; нестрогая граница по
+    первому ключу дублирует его, чтобы база искала по индексу диапазоном,
+    а не сканировала индекс с начала.
+    """
+    op = 'lt' if older else 'gt'
+    conditions = []
+    for i, key in enumerate(keys):
+        equal = {k: v for k, v in zip(keys[:i], values[:i])}
+        equal[f'{key}__{op}'] = values[i]
+        conditions.append(Q(**equal))
+    return Q(**{f'{keys[0]}__{op}e': values[0]}) & reduce(or_, conditions)
+
+
+def count_cache_key(*parts):
+    return 'feed_count:' + ':'.join(str(part) for part in parts)
+
+
+def estimate_count(queryset):
+    """Оценка числа строк таблицы по статистике планировщика.
+
+    Годится только для нефильтрованных выборок; для SQLite статистика
+    появляется после ANALYZE. Возвращает None, если оценки нет.
+    """
+    if queryset.query.where:
+        return None
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples FROM pg_class WHERE oid = %s::regclass'
+    elif connection.vendor == 'sqlite':
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None:
+        return None
+    if connection.vendor == 'postgresql':
+        # A float, -1 until the table is first vacuumed or analyzed
+        count = int(float(row[0]))
+    else:
+        # "rows [rows per distinct value ...]"
+        count = int(row[0].split()[0])
+    return count if count >= 0 else None
+
+
+def cached_count(queryset, key):
+    """Число строк выборки из кэша, оценки или честного COUNT(*)."""
+    count = cache.get(key)
+    if count is None:
+        count = estimate_count(queryset)
+        if count is None or count < COUNT_ESTIMATE_THRESHOLD:
+            count = queryset.count()
+        cache.set(key, count, COUNT_TIMEOUT)
+    return count
+
+
+def order_by_keys(object_list, keys, descending=True):
+    prefix = '-' if descending else ''
+    return object_list.order_by(*(prefix + key for key in keys))
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator админки: большая таблица без фильтров не считается COUNT(*).
+
+    Число строк берется из статистики планировщика (см. estimate_count),
+    фильтрованные выборки считаются честно.
+    """
+
+    @cached_property
+    def count(self):
+        count = estimate_count(self.object_list)
+        if count is None or count < COUNT_ESTIMATE_THRESHOLD:
+            return super().count
+        return count
+
+    def page(self, number):
+        # An estimate only bounds the page number, as in FeedPaginator
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(
+            self.object_list[bottom:bottom + self.per_page], number, self
+        )
+
+
+class FeedPaginator(Paginator):
+    """Обычный постраничный вывод, который уводит глубокие страницы на курсор.
+
+    Первые MAX_OFFSET_PAGES страниц доступны по номеру (?page=N), более
+    глубокие номера ведут на последнюю из них. Ссылки "Предыдущая" и
+    "Следующая" с любой страницы - токены ?before= и ?after=, так что
+    листание не сбивается от новых постов.
+    """
+
+    def __init__(self, object_list, per_page, keys=FEED_KEYS,
+                 count_key=None, total=None, **kwargs):
+        self.keys = keys
+        self.count_key = count_key
+        self.total = total
+        if isinstance(object_list, QuerySet):
+            object_list = order_by_keys(object_list, keys)
+        super().__init__(object_list, per_page, **kwargs)
+
+    @cached_property
+    def count(self):
+        if self.total is not None:
+            return self.total
+        if self.count_key is None:
+            return self.object_list.count()
+        return cached_count(self.object_list, self.count_key)
+
+    @property
+    def offset_page_range(self):
+        return range(1, min(self.num_pages, MAX_OFFSET_PAGES) + 1)
+
+    @property
+    def is_shallow(self):
+        return self.num_pages <= MAX_OFFSET_PAGES
+
+    def validate_number(self, number):
+        number = super().validate_number(number)
+        if number > MAX_OFFSET_PAGES:
+            raise EmptyPage('Глубокие страницы открываются курсором')
+        return number
+
+    def get_page(self, number):
+        # Out-of-range numbers land on the deepest page reachable by OFFSET,
+        # never on num_pages
+        try:
+            number = self.validate_number(number)
+        except PageNotAnInteger:
+            number = 1
+        except EmptyPage:
+            number = max(min(self.num_pages, MAX_OFFSET_PAGES), 1)
+        return self.page(number)
+
+    def page(self, number):
+        # The count may be cached or estimated, so it only bounds the page
+        # number and never truncates the slice itself
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(
+            self.object_list[bottom:bottom + self.per_page], number, self
+        )
+
+    def _get_page(self, *args, **kwargs):
+        page = super()._get_page(*args, **kwargs)
+        page.previous_cursor = None
+        page.next_cursor = None
+        if len(page):
+            if page.has_previous():
+                page.previous_cursor = encode_cursor(page[0], self.keys)
+            if page.has_next():
+                page.next_cursor = encode_cursor(
+                    page[len(page) - 1], self.keys
+                )
+        return page
+
+
+class CursorPage(Sequence):
+    """Страница курсорной пагинации: без номера и без подсчета строк."""
+
+    number = None
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        keys = paginator.keys
+        self.next_cursor = (
+            encode_cursor(object_list[-1], keys)
+            if has_next and object_list else None
+        )
+        self.previous_cursor = (
+            encode_cursor(object_list[0], keys)
+            if has_previous and object_list else None
+        )
+
+    def __repr__(self):
+        return f'<Cursor page of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Курсорная (keyset) пагинация по ключам `keys` в порядке убывания.
+
+    Стоимость страницы не зависит от глубины: вместо OFFSET и COUNT(*)
+    выполняется один запрос `WHERE (ключи) < (курсор) LIMIT per_page + 1`.
+    """
+
+    offset_page_range = range(0)
+    is_shallow = False
+
+    def __init__(self, object_list, per_page, keys=FEED_KEYS,
+                 count_key=None, total=None):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.keys = keys
+        self.count_key = count_key
+        self.total = total
+
+    @cached_property
+    def count(self):
+        # Only computed when a template asks for the total
+        if self.total is not None:
+            return self.total
+        if self.count_key is None:
+            return self.object_list.count()
+        return cached_count(self.object_list, self.count_key)
+
+    def page(self, after=None, before=None):
+        if before:
+            values = decode_cursor(before, self.keys)
+            rows = self._fetch(values, older=False)
+            if len(rows) <= self.per_page:
+                # Nothing newer is left beyond this window
+                return self.page()
+            return CursorPage(rows[:self.per_page][::-1], self, True, True)
+        if after:
+            values = decode_cursor(after, self.keys)
+            rows = self._fetch(values, older=True)
+        else:
+            rows = self._fetch()
+        has_next = len(rows) > self.per_page
+        return CursorPage(rows[:self.per_page], self, has_next, bool(after))
+
+    def get_page(self, after=None, before=None):
+        try:
+            return self.page(after, before)
+        except (InvalidCursor, ValidationError, ValueError):
+            return self.page()
+
+    def _fetch(self, values=None, older=True):
+        if not isinstance(self.object_list, QuerySet):
+            # Composite feeds (see posts.timeline.FollowFeed) do their own
+            # keyset lookups
+            return self.object_list.window(values, older, self.per_page + 1)
+        object_list = order_by_keys(self.object_list, self.keys, older)
+        if values is not None:
+            object_list = object_list.filter(
+                keyset_filter(self.keys, values, older)
+            )
+        return list(object_list[:self.per_page + 1])
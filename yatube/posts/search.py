@@ -0,0 +1,276 @@
+"""Полнотекстовый поиск по заголовкам и текстам постов.
+
+На SQLite с FTS5 индекс - виртуальная таблица posts_post_fts: ранжирует
+bm25, подсвечивает snippet(), все внутри SQLite. На других базах и на
+SQLite без FTS5 работает запасной обратный индекс в таблице SearchTerm:
+слово, пост и вес слова в посте; ранг - сумма весов, умноженных на idf.
+
+Индекс обновляется сигналами при сохранении и удалении поста, с нуля его
+собирает команда rebuild_search_index. Выдача ограничена
+SEARCH_MAX_RESULTS лучшими совпадениями, так что подсчет результатов не
+зависит от размера таблицы.
+"""
+import math
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, Count, F, FloatField, Sum, When
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post, SearchTerm
+
+MAX_RESULTS = settings.SEARCH_MAX_RESULTS
+HEADER_WEIGHT = settings.SEARCH_HEADER_WEIGHT
+MAX_WORDS = 10
+SNIPPET_WORDS = 16
+FTS_TABLE = 'posts_post_fts'
+# Highlight markers that cannot appear in text, replaced after escaping
+MARK_START, MARK_END = '\x02', '\x03'
+WORD = re.compile(r'\w+')
+
+
+def normalize(word):
+    # FTS5 folds the words of a query with its own tokenizer
+    return word.lower()
+
+
+def query_words(query):
+    words = []
+    for word in WORD.findall(query):
+        word = normalize(word)
+        if word not in words:
+            words.append(word)
+    return words[:MAX_WORDS]
+
+
+def _highlight(snippet):
+    return mark_safe(
+        escape(snippet).replace(MARK_START, '<mark>').replace(
+            MARK_END, '</mark>'
+        )
+    )
+
+
+class Fts5Backend:
+
+    def index(self, posts):
+        rows = [(post.pk, post.header, post.text) for post in posts]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(pk,) for pk, _, _ in rows]
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, header, text) '
+                f'VALUES (%s, %s, %s)',
+                rows
+            )
+
+    def remove(self, pks):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(pk,) for pk in pks]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def _match(self, words):
+        # Every word quoted: user input never reaches the FTS5 syntax
+        return ' '.join(f'"{word}"' for word in words)
+
+    def count(self, words):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM (SELECT 1 FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s LIMIT %s)',
+                [self._match(words), MAX_RESULTS]
+            )
+            return cursor.fetchone()[0]
+
+    def ids(self, words):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'LIMIT %s',
+                [self._match(words), MAX_RESULTS]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def search(self, words, offset, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, snippet({FTS_TABLE}, -1, %s, %s, %s, %s) '
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, %s, 1.0) LIMIT %s OFFSET %s',
+                [
+                    MARK_START, MARK_END, '…', SNIPPET_WORDS,
+                    self._match(words), HEADER_WEIGHT, limit, offset,
+                ]
+            )
+            return [
+                (pk, _highlight(snippet)) for pk, snippet in cursor.fetchall()
+            ]
+
+
+class InvertedIndexBackend:
+
+    def _terms(self, post):
+        weights = {}
+        for text, weight in ((post.header, HEADER_WEIGHT), (post.text, 1)):
+            for word in WORD.findall(text):
+                term = normalize(word)[:SearchTerm.TERM_LENGTH]
+                weights[term] = weights.get(term, 0) + weight
+        return [
+            SearchTerm(term=term, post_id=post.pk, weight=weight)
+            for term, weight in weights.items()
+        ]
+
+    def index(self, posts):
+        posts = list(posts)
+        self.remove([post.pk for post in posts])
+        SearchTerm.objects.bulk_create(
+            [term for post in posts for term in self._terms(post)],
+            batch_size=1000
+        )
+
+    def remove(self, pks):
+        SearchTerm.objects.filter(post_id__in=pks).delete()
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+
+    def _ranked(self, words):
+        frequencies = dict(
+            SearchTerm.objects.filter(term__in=words).values_list(
+                'term'
+            ).annotate(Count('post_id')).order_by()
+        )
+        if len(frequencies) < len(words):
+            return SearchTerm.objects.none()
+        # The highest id is a good enough document count, and free
+        total = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 1
+        score = Sum(Case(
+            *(When(term=term, then=F('weight') * math.log(
+                1 + total / frequency
+            )) for term, frequency in frequencies.items()),
+            output_field=FloatField(),
+        ))
+        return SearchTerm.objects.filter(term__in=words).values(
+            'post_id'
+        ).annotate(
+            matched=Count('term'), score=score
+        ).filter(matched=len(words)).order_by('-score', '-post_id')
+
+    def count(self, words):
+        return self._ranked(words)[:MAX_RESULTS].count()
+
+    def ids(self, words):
+        return [row['post_id'] for row in self._ranked(words)[:MAX_RESULTS]]
+
+    def _snippet(self, post, words):
+        for text in (post.text, post.header):
+            tokens = list(WORD.finditer(text))
+            hits = [
+                i for i, token in enumerate(tokens)
+                if normalize(token.group()) in words
+            ]
+            if hits:
+                break
+        else:
+            return escape(post.text[:200])
+        first = max(hits[0] - SNIPPET_WORDS // 4, 0)
+        window = tokens[first:first + SNIPPET_WORDS]
+        parts = ['…'] if first else []
+        position = window[0].start()
+        for token in window:
+            parts.append(text[position:token.start()])
+            if normalize(token.group()) in words:
+                parts.append(MARK_START + token.group() + MARK_END)
+            else:
+                parts.append(token.group())
+            position = token.end()
+        if window[-1] is not tokens[-1]:
+            parts.append('…')
+        return _highlight(''.join(parts))
+
+    def search(self, words, offset, limit):
+        pks = [
+            row['post_id']
+            for row in self._ranked(words)[offset:offset + limit]
+        ]
+        posts = Post.objects.only('header', 'text').in_bulk(pks)
+        return [
+            (pk, self._snippet(posts[pk], words)) for pk in pks if pk in posts
+        ]
+
+
+_backend = None
+
+
+def backend():
+    global _backend
+    if _backend is None:
+        has_fts = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+        _backend = Fts5Backend() if has_fts else InvertedIndexBackend()
+    return _backend
+
+
+def index_posts(posts):
+    backend().index(posts)
+
+
+def remove_posts(pks):
+    backend().remove(pks)
+
+
+def post_ids(query):
+    """Номера до SEARCH_MAX_RESULTS подходящих постов, без фрагментов."""
+    words = query_words(query)
+    return backend().ids(words) if words else []
+
+
+class SearchResults:
+    """Результаты поиска для Paginator: считаются и читаются по срезам.
+
+    Посты среза подгружаются одним запросом, в post.snippet - фрагмент
+    текста с подсвеченными словами запроса.
+    """
+
+    def __init__(self, query, search_backend=None):
+        self.words = query_words(query)
+        self.backend = search_backend or backend()
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.words) if self.words else 0
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not self.words:
+            return []
+        hits = self.backend.search(
+            self.words, item.start, item.stop - item.start
+        )
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [pk for pk, _ in hits]
+        )
+        results = []
+        for pk, snippet in hits:
+            if pk in posts:
+                posts[pk].snippet = snippet
+                results.append(posts[pk])
+        return results
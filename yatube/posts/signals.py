@@ -0,0 +1,124 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, feed_cache, media, search, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, UserStats
+from .paginators import count_cache_key
+
+User = get_user_model()
+# Saves that touch only these columns do not change any rendered page
+INVISIBLE_USER_FIELDS = {'last_login', 'password'}
+
+
+def feed_count_keys(post, group_ids=()):
+    """Ключи кэшированных счетчиков всех лент, в которых виден пост."""
+    keys = [
+        count_cache_key('index'),
+        count_cache_key('profile', post.author_id),
+    ]
+    keys.extend(
+        count_cache_key('group', group_id)
+        for group_id in {post.group_id, *group_ids} if group_id
+    )
+    return keys
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_state(sender, instance, **kwargs):
+    instance._old_group_id = None
+    instance._old_image = ''
+    if instance.pk is not None:
+        instance._old_group_id, instance._old_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image').first() or (None, '')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    old_group_id = getattr(instance, '_old_group_id', None)
+    if created or old_group_id != instance.group_id:
+        cache.delete_many(feed_count_keys(instance, [old_group_id]))
+        counters.change(Group, old_group_id, post_count=-1)
+        counters.change(Group, instance.group_id, post_count=1)
+    if created:
+        counters.change_user(instance.author_id, post_count=1)
+        timeline.push_post(instance)
+    old_image = getattr(instance, '_old_image', '')
+    if old_image != instance.image.name:
+        # Every path that changes the image, admin included, gets it here
+        media.refresh_metadata(instance)
+        thumbnails.schedule(instance)
+        media.release(old_image)
+    search.index_posts([instance])
+    feed_cache.bump(*feed_cache.post_scopes(instance, [old_group_id]))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    cache.delete_many(feed_count_keys(instance))
+    counters.change_user(instance.author_id, post_count=-1)
+    counters.change(Group, instance.group_id, post_count=-1)
+    timeline.forget_post(instance)
+    media.release(instance.image.name)
+    search.remove_posts([instance.pk])
+    feed_cache.bump(*feed_cache.post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change(Post, instance.post_id, comment_count=1)
+    feed_cache.bump(('comments', instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change(Post, instance.post_id, comment_count=-1)
+    feed_cache.bump(('comments', instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user(instance.author_id, follower_count=1)
+        counters.change_user(instance.user_id, following_count=1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        follow_changed(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, follower_count=-1)
+    counters.change_user(instance.user_id, following_count=-1)
+    timeline.prune(instance.user_id, instance.author_id)
+    timeline.follower_lost(instance.author_id)
+    follow_changed(instance)
+
+
+def follow_changed(follow):
+    # Both profiles show their counters, the author's also the button
+    feed_cache.forget_following(follow.user_id)
+    feed_cache.bump(
+        ('follow', follow.user_id),
+        ('profile', follow.user.username),
+        ('profile', follow.author.username),
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    feed_cache.bump(feed_cache.EVERYTHING)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.create(user=instance)
+        return
+    update_fields = kwargs.get('update_fields')
+    if update_fields is None or set(update_fields) - INVISIBLE_USER_FIELDS:
+        # Author names are rendered on every feed
+        feed_cache.bump(feed_cache.EVERYTHING)
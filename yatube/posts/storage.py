@@ -0,0 +1,45 @@
+"""Хранилище картинок постов с именами по содержимому.
+
+Файл сохраняется как <upload_to>/<2 знака>/<sha256>.<расширение>, так что
+одинаковые загрузки превращаются в один файл с одними миниатюрами. Файл
+не меняется, пока существует его имя, поэтому такие адреса можно отдавать
+с вечным кэшем, например в nginx:
+
+    location ~ ^/media/posts/../ {
+        expires max;
+        add_header Cache-Control immutable;
+    }
+
+Ссылки на файл считает сама таблица постов, см. posts.media.release.
+"""
+import hashlib
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def content_name(name, content):
+    """Имя файла по хешу содержимого, в каталоге исходного имени."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    directory, filename = posixpath.split(name)
+    extension = posixpath.splitext(filename)[1].lower()
+    hexdigest = digest.hexdigest()
+    return posixpath.join(directory, hexdigest[:2], hexdigest + extension)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = content_name(name, content)
+        # The same bytes are already stored under this name
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
@@ -0,0 +1,21 @@
+from django import template
+
+from .. import thumbnails
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def picture(post, sizes='100vw'):
+    width, height = thumbnails.RATIO
+    return {
+        # Feed pages resolve the whole page up front, see attach_pictures
+        'picture': (
+            post.picture if hasattr(post, 'picture')
+            else thumbnails.picture(post)
+        ),
+        'placeholder': post.image_placeholder,
+        'sizes': sizes,
+        'width': width,
+        'height': height,
+    }
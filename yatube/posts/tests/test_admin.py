@@ -0,0 +1,119 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AdminChangelistTests(TestCase):
+    """Списки админки не зависят от размеров таблиц"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.author = User.objects.create(username='admin_author')
+        cls.group = Group.objects.create(
+            title='тестовое название',
+            slug='admin-slug',
+            description='тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Уникальная фраза для поиска',
+            author=cls.author,
+            group=cls.group,
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.author, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.admin, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def changelist(self, model, **params):
+        url = reverse(f'admin:posts_{model}_changelist')
+        return self.client.get(url, params)
+
+    def test_changelists_open(self):
+        """Списки постов, комментариев, подписок и групп открываются"""
+        for model in ('post', 'comment', 'follow', 'group'):
+            with self.subTest(model=model):
+                self.assertEqual(self.changelist(model).status_code, 200)
+
+    def test_no_user_selects(self):
+        """В списке и форме поста нет выпадающих списков пользователей"""
+        response = self.changelist('post')
+        self.assertNotContains(response, 'name="form-0-author"')
+        url = reverse('admin:posts_post_change', args=(self.post.pk,))
+        response = self.client.get(url)
+        self.assertNotContains(response, f'<option value="{self.author.pk}"')
+
+    def test_queries_do_not_grow_with_rows(self):
+        """Число запросов списка не зависит от числа строк"""
+        for model in ('post', 'comment', 'follow'):
+            with self.subTest(model=model):
+                with CaptureQueriesContext(connection) as before:
+                    self.changelist(model)
+                for i in range(5):
+                    user = User.objects.create(username=f'admin_{model}_{i}')
+                    post = Post.objects.create(text='Текст', author=user)
+                    Comment.objects.create(post=post, author=user, text='К')
+                    Follow.objects.create(user=user, author=self.author)
+                with CaptureQueriesContext(connection) as after:
+                    self.changelist(model)
+                self.assertEqual(len(after), len(before))
+
+    @mock.patch('posts.paginators.COUNT_ESTIMATE_THRESHOLD', 1)
+    def test_unfiltered_count_is_estimated(self):
+        """Без фильтров число постов берется из статистики планировщика"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Оценка проверяется на SQLite')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Post.objects.bulk_create(
+            Post(text='Тестовый текст', author=self.author) for _ in range(3)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.changelist('post')
+        self.assertEqual(response.context['cl'].result_count, 1)
+        self.assertFalse(any(
+            'COUNT(' in query['sql'].upper() for query in queries
+        ))
+
+    def test_search(self):
+        """Поиск находит пост по тексту, номеру и имени автора"""
+        for term in ('уникальная фраза', str(self.post.pk), 'admin_author'):
+            with self.subTest(term=term):
+                response = self.changelist('post', q=term)
+                self.assertEqual(
+                    list(response.context['cl'].result_list), [self.post]
+                )
+        response = self.changelist('post', q='admin_auth')
+        self.assertEqual(list(response.context['cl'].result_list), [])
+
+    def test_follow_search_by_either_user(self):
+        """Подписка находится по имени подписчика и автора"""
+        for term in ('admin', 'admin_author'):
+            with self.subTest(term=term):
+                response = self.changelist('follow', q=term)
+                self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_group_filter(self):
+        """Фильтр предлагает группы и фильтрует по ним"""
+        response = self.changelist('post')
+        self.assertContains(response, f'?group={self.group.pk}')
+        Post.objects.create(text='Без группы', author=self.author)
+        response = self.changelist('post', group=self.group.pk)
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.post]
+        )
@@ -0,0 +1,166 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+POSTS_PER_PAGE = settings.POSTS_PER_PAGE
+
+
+class ApiTests(TestCase):
+    """JSON API повторяет ленты и пост из views"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='api_author')
+        cls.reader = User.objects.create(username='api_reader')
+        cls.group = Group.objects.create(
+            title='тестовое название',
+            slug='api-slug',
+            description='тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.posts = [
+            Post.objects.create(
+                text=f'Пост {i}', author=self.author,
+                group=self.group if i % 2 else None,
+            )
+            for i in range(POSTS_PER_PAGE + 3)
+        ]
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def get(self, name, params=None, client=None, **kwargs):
+        url = reverse(f'api:{name}', kwargs=kwargs)
+        return (client or self.client).get(url, params or {})
+
+    def test_feeds(self):
+        """Ленты отдают те же посты, что и HTML-страницы"""
+        newest = [post.pk for post in reversed(self.posts)]
+        in_group = [
+            post.pk for post in reversed(self.posts) if post.group_id
+        ]
+        feeds = {
+            'index': (self.get('index'), newest),
+            'group_posts': (
+                self.get('group_posts', slug=self.group.slug), in_group
+            ),
+            'profile': (
+                self.get('profile', username=self.author.username), newest
+            ),
+            'follow_index': (
+                self.get('follow_index', client=self.reader_client), newest
+            ),
+        }
+        for name, (response, expected) in feeds.items():
+            with self.subTest(feed=name):
+                self.assertEqual(response.status_code, 200)
+                ids = [post['id'] for post in response.json()['results']]
+                self.assertEqual(ids, expected[:POSTS_PER_PAGE])
+
+    def test_extra_objects(self):
+        """Лента группы и профиль описывают группу и автора"""
+        data = self.get('group_posts', slug=self.group.slug).json()
+        self.assertEqual(data['group']['slug'], self.group.slug)
+        data = self.get('profile', username=self.author.username).json()
+        self.assertEqual(data['author']['post_count'], len(self.posts))
+
+    def test_cursor_pagination(self):
+        """Курсор листает ленту до конца и обратно"""
+        first = self.get('index').json()
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        ids = [post['id'] for post in first['results'] + second['results']]
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)])
+        self.assertIsNone(second['next'])
+        back = self.client.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_sparse_fields(self):
+        """?fields= выбирает только нужные столбцы"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get('index', {'fields': 'id,author'})
+        self.assertEqual(
+            set(response.json()['results'][0]), {'id', 'author'}
+        )
+        feed_sql = next(
+            query['sql'] for query in queries
+            if 'FROM "posts_post"' in query['sql']
+        )
+        self.assertNotIn('"text"', feed_sql)
+        self.assertNotIn('COUNT(', feed_sql.upper())
+
+    def test_limit(self):
+        """?limit= задает размер страницы"""
+        data = self.get('index', {'limit': 2}).json()
+        self.assertEqual(len(data['results']), 2)
+        self.assertIn('limit=2', data['next'])
+
+    def test_bad_requests(self):
+        """Неизвестные поля, курсор и limit дают 400"""
+        for params in (
+            {'fields': 'id,password'}, {'after': 'мусор'}, {'limit': 'x'},
+        ):
+            with self.subTest(params=params):
+                response = self.get('index', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('detail', response.json())
+
+    def test_not_found_and_auth(self):
+        """Несуществующие объекты - 404, лента подписок без входа - 401"""
+        responses = {
+            404: [
+                self.get('group_posts', slug='missing'),
+                self.get('profile', username='missing'),
+                self.get('post_detail', post_id=10 ** 6),
+                self.get('post_comments', post_id=10 ** 6),
+            ],
+            401: [self.get('follow_index')],
+        }
+        for status, items in responses.items():
+            for response in items:
+                with self.subTest(status=status):
+                    self.assertEqual(response.status_code, status)
+
+    def test_post_detail_and_comments(self):
+        """Пост и его комментарии"""
+        post = self.posts[0]
+        Comment.objects.create(post=post, author=self.reader, text='Первый')
+        data = self.get('post_detail', post_id=post.pk).json()
+        self.assertEqual(data['text'], post.text)
+        self.assertEqual(data['comment_count'], 1)
+        self.assertIsNone(data['image'])
+        data = self.get(
+            'post_comments', {'fields': 'text,author'}, post_id=post.pk
+        ).json()
+        self.assertEqual(
+            data['results'], [{'text': 'Первый', 'author': 'api_reader'}]
+        )
+
+    def test_conditional_requests(self):
+        """Повторный запрос с ETag получает 304"""
+        post_id = self.posts[0].pk
+        for response in (
+            self.get('index'), self.get('post_detail', post_id=post_id)
+        ):
+            with self.subTest(url=response.request['PATH_INFO']):
+                again = self.client.get(
+                    response.request['PATH_INFO'],
+                    HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(again.status_code, 304)
+
+    def test_read_only(self):
+        """Изменяющие методы запрещены"""
+        response = self.client.post(reverse('api:index'))
+        self.assertEqual(response.status_code, 405)
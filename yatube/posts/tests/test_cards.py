@@ -0,0 +1,83 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..cards import attach_cards
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(
+            username='card_author', first_name='Иван', last_name='Петров'
+        )
+        cls.reader = User.objects.create(username='card_reader')
+        cls.group = Group.objects.create(
+            title='тестовое название',
+            slug='card-slug',
+            description='тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.author,
+            group=cls.group,
+        )
+        cls.GROUP_REVERSE = reverse(
+            'posts:group_posts',
+            kwargs={'slug': cls.group.slug}
+        )
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        cache.clear()
+
+    def posts(self):
+        return list(self.group.posts.select_related('author'))
+
+    def test_cards_are_rendered_once(self):
+        """Карточка рендерится один раз, дальше читается из кэша"""
+        attach_cards(self.posts())
+        with mock.patch('posts.cards.render_to_string') as render:
+            posts = self.posts()
+            attach_cards(posts)
+        render.assert_not_called()
+        self.assertIn('Тестовый текст', posts[0].card)
+
+    def test_edit_renders_new_version(self):
+        """Правка поста выпускает новую версию карточки"""
+        self.reader_client.get(self.GROUP_REVERSE)
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Новый текст', 'group': self.group.pk},
+        )
+        response = self.reader_client.get(self.GROUP_REVERSE)
+        self.assertContains(response, 'Новый текст')
+        self.assertNotContains(response, 'Тестовый текст')
+
+    def test_author_rename_renders_new_version(self):
+        """Смена имени автора выпускает новую версию карточки"""
+        self.reader_client.get(self.GROUP_REVERSE)
+        author = User.objects.get(pk=self.author.pk)
+        author.last_name = 'Сидоров'
+        author.save()
+        response = self.reader_client.get(self.GROUP_REVERSE)
+        self.assertContains(response, 'Иван Сидоров')
+
+    def test_edit_link_is_rendered_per_user(self):
+        """Ссылка на правку не попадает в общую карточку"""
+        edit_url = reverse('posts:post_edit', kwargs={'post_id': self.post.pk})
+        response = self.author_client.get(self.GROUP_REVERSE)
+        self.assertContains(response, edit_url)
+        response = self.reader_client.get(self.GROUP_REVERSE)
+        self.assertNotContains(response, edit_url)
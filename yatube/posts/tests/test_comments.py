@@ -1,5 +1,6 @@
 from http import HTTPStatus
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase
 from django.urls import reverse
@@ -7,6 +8,7 @@ from django.urls import reverse
 from ..models import Comment, Group, Post
 
 User = get_user_model()
+COMMENTS_PER_PAGE = settings.COMMENTS_PER_PAGE
 
 
 class PostCommentsTests(TestCase):
@@ -77,3 +79,74 @@ class PostCommentsTests(TestCase):
             guest_response,
             self.LOGIN + '?next=' + self.ADD_COMMENT_REVERSE
         )
+
+
+class CommentPaginationTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='comment_author')
+        cls.post = Post.objects.create(
+            text='тестовый текст',
+            author=cls.author,
+        )
+        cls.commenters = [
+            User.objects.create(username=f'commenter_{i}') for i in range(3)
+        ]
+        for i in range(COMMENTS_PER_PAGE * 2 + 5):
+            Comment.objects.create(
+                post=cls.post,
+                author=cls.commenters[i % len(cls.commenters)],
+                text=f'Комментарий {i}',
+            )
+        cls.expected = list(
+            cls.post.comments.order_by('-created', '-pk').values_list(
+                'pk', flat=True
+            )
+        )
+        cls.DETAIL_REVERSE = reverse(
+            'posts:post_detail',
+            kwargs={'post_id': cls.post.pk}
+        )
+        cls.COMMENTS_REVERSE = reverse(
+            'posts:post_comments',
+            kwargs={'post_id': cls.post.pk}
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_detail_shows_first_comments(self):
+        """Страница поста выводит только первую порцию комментариев"""
+        # ETag validators, the post and the first page of comments
+        with self.assertNumQueries(3):
+            response = self.guest_client.get(self.DETAIL_REVERSE)
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.pk for comment in comments],
+            self.expected[:COMMENTS_PER_PAGE]
+        )
+        self.assertContains(
+            response, f'Комментариев: {len(self.expected)}'
+        )
+        self.assertContains(
+            response, f'{self.COMMENTS_REVERSE}?after={comments.next_cursor}'
+        )
+
+    def test_fragment_loads_next_comments(self):
+        """Фрагмент по курсору догружает следующие комментарии"""
+        seen = []
+        url = self.COMMENTS_REVERSE
+        after = None
+        while True:
+            response = self.guest_client.get(
+                url, {'after': after} if after else {}
+            )
+            self.assertNotContains(response, '<html')
+            page = response.context['comments']
+            seen.extend(comment.pk for comment in page)
+            if not page.has_next():
+                break
+            after = page.next_cursor
+        self.assertEqual(seen, self.expected)
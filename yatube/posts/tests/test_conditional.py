@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='conditional_author')
+        cls.group = Group.objects.create(
+            title='тестовое название',
+            slug='conditional-slug',
+            description='тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.author,
+            group=cls.group,
+        )
+        cls.DETAIL_REVERSE = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.pk}
+        )
+        cls.FEED_REVERSES = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': cls.group.slug}),
+            reverse(
+                'posts:profile', kwargs={'username': cls.author.username}
+            ),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_post_detail_not_modified(self):
+        """Неизмененная страница поста отдается ответом 304"""
+        response = self.guest_client.get(self.DETAIL_REVERSE)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(
+                self.DETAIL_REVERSE, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_post_detail_etag_changes(self):
+        """Комментарий и правка поста меняют ETag страницы"""
+        etags = {self.guest_client.get(self.DETAIL_REVERSE)['ETag']}
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий'
+        )
+        etags.add(self.guest_client.get(self.DETAIL_REVERSE)['ETag'])
+        self.post.text = 'Новый текст'
+        self.post.save()
+        etags.add(self.guest_client.get(self.DETAIL_REVERSE)['ETag'])
+        self.assertEqual(len(etags), 3)
+
+    def test_post_detail_etag_follows_changes_outside_the_form(self):
+        """Заголовок, комментарий и имя его автора меняют ETag"""
+        commenter = User.objects.create(username='conditional_commenter')
+        comment = Comment.objects.create(
+            post=self.post, author=commenter, text='Комментарий'
+        )
+        etags = {self.guest_client.get(self.DETAIL_REVERSE)['ETag']}
+        self.post.header = 'Новый заголовок'
+        self.post.save()
+        etags.add(self.guest_client.get(self.DETAIL_REVERSE)['ETag'])
+        comment.text = 'Исправленный комментарий'
+        comment.save()
+        etags.add(self.guest_client.get(self.DETAIL_REVERSE)['ETag'])
+        commenter.username = 'conditional_renamed'
+        commenter.save()
+        etags.add(self.guest_client.get(self.DETAIL_REVERSE)['ETag'])
+        self.assertEqual(len(etags), 4)
+
+    def test_post_detail_etag_depends_on_viewer(self):
+        """Гость и автор получают разные ETag"""
+        self.assertNotEqual(
+            self.guest_client.get(self.DETAIL_REVERSE)['ETag'],
+            self.author_client.get(self.DETAIL_REVERSE)['ETag'],
+        )
+
+    def test_feeds_not_modified(self):
+        """Неизмененные ленты отдаются ответом 304 без запросов к базе"""
+        for url in self.FEED_REVERSES:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_feed_etag_changes_with_new_post(self):
+        """Новый пост меняет ETag ленты"""
+        for url in self.FEED_REVERSES:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                Post.objects.create(
+                    text='Еще пост', author=self.author, group=self.group
+                )
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
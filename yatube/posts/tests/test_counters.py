@@ -0,0 +1,143 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class CounterTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='counter_author')
+        cls.reader = User.objects.create(username='counter_reader')
+        cls.group = Group.objects.create(
+            title='тестовое название',
+            slug='counter-slug',
+            description='тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='другая группа',
+            slug='counter-other-slug',
+            description='тестовое описание',
+        )
+        cls.PROFILE_FOLLOW_REVERSE = reverse(
+            'posts:profile_follow',
+            kwargs={'username': cls.author.username}
+        )
+        cls.PROFILE_UNFOLLOW_REVERSE = reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': cls.author.username}
+        )
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_and_comment_counters(self):
+        """Создание и удаление постов и комментариев меняет счетчики"""
+        self.author_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Тестовый текст', 'group': self.group.pk},
+            follow=True
+        )
+        post = Post.objects.get(author=self.author)
+        self.assertEqual(self.stats(self.author).post_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.post_count, 1)
+        self.reader_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            data={'text': 'Тестовый комментарий'},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        post.delete()
+        self.assertEqual(self.stats(self.author).post_count, 0)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.post_count, 0)
+
+    def test_group_change_moves_counter(self):
+        """Перенос поста переносит его в счетчик другой группы"""
+        post = Post.objects.create(
+            text='Тестовый текст', author=self.author, group=self.group
+        )
+        post.group = self.other_group
+        post.save()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.post_count, 0)
+        self.assertEqual(self.other_group.post_count, 1)
+
+    def test_stale_instance_keeps_counter(self):
+        """Сохранение устаревшего экземпляра не затирает счетчик"""
+        post = Post.objects.create(text='Тестовый текст', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Текст')
+        post.text = 'Новый текст'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+
+    def test_follow_counters(self):
+        """Подписка и отписка меняют счетчики обоих пользователей"""
+        self.reader_client.get(self.PROFILE_FOLLOW_REVERSE)
+        self.reader_client.get(self.PROFILE_FOLLOW_REVERSE)
+        self.assertEqual(self.stats(self.author).follower_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.reader_client.get(self.PROFILE_UNFOLLOW_REVERSE)
+        self.assertEqual(self.stats(self.author).follower_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_pages_read_counters(self):
+        """Страницы выводят счетчики, а не считают строки"""
+        post = Post.objects.create(text='Тестовый текст', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Текст')
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, 'Комментариев: 1')
+        response = self.reader_client.get(
+            reverse('posts:profile', kwargs={'username': self.author})
+        )
+        self.assertContains(response, 'Всего постов: 1')
+        self.assertContains(response, 'Подписчиков: 1')
+
+    def test_reconcile_command_repairs_drift(self):
+        """Команда пересчета чинит разошедшиеся и недостающие счетчики"""
+        post = Post.objects.create(
+            text='Тестовый текст', author=self.author, group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Текст')
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.update(
+            post_count=7, follower_count=7, following_count=7
+        )
+        UserStats.objects.filter(user=self.reader).delete()
+        Group.objects.update(post_count=7)
+        Post.objects.update(comment_count=7)
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        author_stats = self.stats(self.author)
+        self.assertEqual(
+            (author_stats.post_count, author_stats.follower_count,
+             author_stats.following_count),
+            (1, 1, 0)
+        )
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(
+            (self.group.post_count, self.other_group.post_count), (1, 0)
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
@@ -0,0 +1,121 @@
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import exports
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    """Потоковая выгрузка постов, комментариев и подписок"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='export_author')
+        cls.reader = User.objects.create(username='export_reader')
+        cls.staff = User.objects.create(username='export_staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='тестовое название',
+            slug='export-slug',
+            description='тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.posts = [
+            Post.objects.create(
+                text=f'Пост {i}, с запятой', author=self.author,
+                group=self.group if i % 2 else None,
+            )
+            for i in range(5)
+        ]
+        Comment.objects.create(
+            post=self.posts[0], author=self.reader, text='Комментарий'
+        )
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_records_in_id_windows(self):
+        """Таблица читается окнами по id, по запросу на окно"""
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(exports.records('posts', batch_size=2))
+        self.assertEqual(
+            [row[0] for row in rows], [post.pk for post in self.posts]
+        )
+        self.assertEqual(len(queries), 3)
+        self.assertIn('"id" >', queries[-1]['sql'])
+
+    def test_jsonl(self):
+        """JSONL: строка на объект, ссылки - имена и slug"""
+        data = b''.join(exports.stream('posts', 'jsonl')).decode()
+        rows = [json.loads(line) for line in data.splitlines()]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[1]['author'], 'export_author')
+        self.assertEqual(rows[1]['group'], 'export-slug')
+        self.assertIsNone(rows[0]['group'])
+
+    def test_gzip_csv(self):
+        """CSV сжимается gzip на лету"""
+        data = gzip.decompress(b''.join(
+            exports.stream('comments', 'csv', compress=True)
+        )).decode()
+        rows = list(csv.DictReader(io.StringIO(data)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['author'], 'export_reader')
+        self.assertEqual(rows[0]['edited'], '')
+
+    def test_round_trip(self):
+        """Выгрузку можно загрузить обратно командой import_data"""
+        for kind, file_format in (('posts', 'csv'), ('follows', 'jsonl')):
+            path = os.path.join(self.directory, f'{kind}.{file_format}.gz')
+            call_command('export_data', kind, path, stdout=StringIO())
+            before = list(exports.records(kind))
+            exports.EXPORTS[kind][0].objects.all().delete()
+            with gzip.open(path, 'rt', encoding='utf-8') as packed, \
+                    open(path[:-3], 'w', encoding='utf-8') as plain:
+                shutil.copyfileobj(packed, plain)
+            call_command(
+                'import_data', kind, path[:-3], '--no-rebuild',
+                stdout=StringIO()
+            )
+            self.assertEqual(list(exports.records(kind)), before)
+
+    def test_view_is_staff_only(self):
+        """Выгрузку по адресу получают только сотрудники"""
+        url = reverse('posts:export', kwargs={'kind': 'posts'})
+        response = Client().get(url)
+        self.assertEqual(response.status_code, 302)
+        client = Client()
+        client.force_login(self.author)
+        self.assertEqual(client.get(url).status_code, 302)
+
+    def test_view_streams(self):
+        """Сотрудник получает потоковый ответ в выбранном формате"""
+        client = Client()
+        client.force_login(self.staff)
+        url = reverse('posts:export', kwargs={'kind': 'follows'})
+        response = client.get(url, {'format': 'csv', 'gzip': '1'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('follows.csv.gz', response['Content-Disposition'])
+        data = gzip.decompress(b''.join(response.streaming_content))
+        self.assertIn('export_reader,export_author', data.decode())
+        for params in ({'format': 'xml'}, {}):
+            with self.subTest(params=params):
+                url = reverse('posts:export', kwargs={'kind': 'users'})
+                self.assertEqual(client.get(url, params).status_code, 404)
@@ -0,0 +1,187 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .. import search, thumbnails
+from ..imports import PostImporter
+from ..models import Follow, Group, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class ImportDataTests(TestCase):
+    """Загрузка архива командой import_data"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write(self, name, rows):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            for row in rows:
+                file.write(row if isinstance(row, str) else json.dumps(row))
+                file.write('\n')
+        return path
+
+    def load(self, kind, path, *args):
+        output = StringIO()
+        call_command('import_data', kind, path, *args, stdout=output)
+        return output.getvalue()
+
+    def load_archive(self):
+        self.load('users', self.write('users.jsonl', [
+            {'username': 'archive_author', 'first_name': 'Автор'},
+            {'username': 'archive_reader'},
+        ]))
+        self.load('groups', self.write('groups.jsonl', [
+            {'title': 'Архив', 'slug': 'archive'},
+        ]))
+        self.load('follows', self.write('follows.jsonl', [
+            {'user': 'archive_reader', 'author': 'archive_author'},
+        ]))
+        self.load('posts', self.write('posts.jsonl', [
+            {
+                'id': 500, 'text': 'Архивный пост', 'author': 'archive_author',
+                'group': 'archive', 'pub_date': '2015-06-01T12:00:00+03:00',
+            },
+            {'id': 501, 'text': 'Пост без группы', 'author': 'archive_author'},
+        ]))
+        self.load('comments', self.write('comments.jsonl', [
+            {'post': 500, 'author': 'archive_reader', 'text': 'Комментарий'},
+        ]))
+
+    def test_archive_is_loaded(self):
+        """Загружаются все модели, даты из архива сохраняются"""
+        self.load_archive()
+        post = Post.objects.get(pk=500)
+        self.assertEqual(post.group.slug, 'archive')
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(post.comments.get().author.username, 'archive_reader')
+        self.assertTrue(Follow.objects.filter(
+            user__username='archive_reader', author__username='archive_author'
+        ).exists())
+        self.assertFalse(User.objects.get(username='archive_reader')
+                         .has_usable_password())
+
+    def test_derived_data_rebuilt(self):
+        """Счетчики, поиск и ленты подписок пересобираются после загрузки"""
+        self.load_archive()
+        author = User.objects.get(username='archive_author')
+        self.assertEqual(UserStats.objects.get(user=author).post_count, 2)
+        self.assertEqual(UserStats.objects.get(user=author).follower_count, 1)
+        self.assertEqual(Group.objects.get(slug='archive').post_count, 1)
+        self.assertEqual(Post.objects.get(pk=500).comment_count, 1)
+        self.assertEqual(search.post_ids('архивный'), [500])
+        self.assertEqual(
+            TimelineEntry.objects.filter(
+                user__username='archive_reader'
+            ).count(), 2
+        )
+
+    @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+    def test_images_processed(self):
+        """У загруженных картинок появляются метаданные и миниатюры"""
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, ignore_errors=True)
+        name = Post._meta.get_field('image').storage.save(
+            'posts/archive.gif', ContentFile(SMALL_GIF)
+        )
+        User.objects.create(username='image_author')
+        self.load('posts', self.write('posts.jsonl', [
+            {'text': 'С картинкой', 'author': 'image_author', 'image': name},
+        ]))
+        post = Post.objects.get()
+        self.assertEqual(post.image_width, 2)
+        self.assertTrue(thumbnails.is_ready(name, post.thumbnails_version))
+
+    def test_new_rows_number_after_archive_ids(self):
+        """Новые посты получают номера после загруженных"""
+        self.load_archive()
+        post = Post.objects.create(
+            text='Новый', author=User.objects.get(username='archive_author')
+        )
+        self.assertGreater(post.pk, 501)
+
+    def test_csv(self):
+        """CSV читается так же, пустая ячейка - отсутствующее значение"""
+        User.objects.create(username='csv_author')
+        path = self.write('posts.csv', [
+            'text,author,group,header',
+            '"Текст, с запятой",csv_author,,',
+        ])
+        self.load('posts', path)
+        post = Post.objects.get()
+        self.assertEqual(post.text, 'Текст, с запятой')
+        self.assertIsNone(post.group)
+
+    def test_unresolved_rows_skipped(self):
+        """Строки с несуществующими ссылками пропускаются"""
+        User.objects.create(username='known')
+        output = self.load('posts', self.write('posts.jsonl', [
+            {'text': 'Есть автор', 'author': 'known'},
+            {'text': 'Нет автора', 'author': 'unknown'},
+            {'text': 'Нет группы', 'author': 'known', 'group': 'missing'},
+        ]))
+        self.assertEqual(Post.objects.get().text, 'Есть автор')
+        self.assertIn('загружено 1, без найденных ссылок 2', output)
+        self.assertIn('строк/с', output)
+
+    def test_reload_does_not_duplicate(self):
+        """Повторная загрузка строк с ключами ничего не дублирует"""
+        self.load_archive()
+        self.load_archive()
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_resume(self):
+        """После ошибки загрузка продолжается с первой незагруженной строки"""
+        User.objects.create(username='resume_author')
+        rows = [
+            {'text': 'Первый', 'author': 'resume_author'},
+            {'text': 'Второй', 'author': 'resume_author', 'pub_date': 'вчера'},
+        ]
+        path = self.write('posts.jsonl', rows)
+        with self.assertRaises(CommandError):
+            self.load('posts', path, '--batch-size', '1')
+        self.assertEqual(Post.objects.count(), 1)
+        rows[1]['pub_date'] = '2020-01-01T00:00:00'
+        self.write('posts.jsonl', rows)
+        self.load('posts', path, '--batch-size', '1', '--resume')
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['Второй', 'Первый']
+        )
+
+    def test_batch_queries_do_not_grow_with_rows(self):
+        """Пачка загружается одинаковым числом запросов при любом размере"""
+        users = [User.objects.create(username=f'batch_{i}') for i in range(5)]
+        counts = []
+        for size in (1, 5):
+            batch = [
+                {'text': 'Текст', 'author': user.username}
+                for user in users[:size]
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                PostImporter().load(batch)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
@@ -0,0 +1,89 @@
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+
+from ..models import Follow, Group, Post, TimelineEntry
+from ..paginators import (CursorPaginator, FeedPaginator, keyset_filter,
+                          order_by_keys)
+from ..timeline import TIMELINE_KEYS
+
+User = get_user_model()
+POSTS_PER_PAGE = settings.POSTS_PER_PAGE
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN для SQLite')
+class FeedIndexTests(TestCase):
+    """Запросы лент читают индексы, а не сканируют и сортируют таблицу"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='index_author')
+        cls.reader = User.objects.create(username='index_reader')
+        cls.group = Group.objects.create(
+            title='тестовое название',
+            slug='index-slug',
+            description='тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.author,
+            group=cls.group,
+        )
+
+    def plan(self, queryset):
+        sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndexes(self, queryset, seek=False):
+        plan = self.plan(queryset)
+        if seek:
+            # Deep pages must start from the cursor, not from the top
+            self.assertTrue(plan[0].startswith('SEARCH'), plan)
+        for step in plan:
+            self.assertNotIn('TEMP B-TREE', step, plan)
+            if step.startswith(('SCAN', 'SEARCH')):
+                self.assertRegex(step, 'INDEX|PRIMARY KEY', plan)
+
+    def feed_queries(self):
+        values = [str(value) for value in (self.post.pub_date, self.post.pk)]
+        feeds = {
+            'index': Post.objects.select_related('author', 'group'),
+            'group': self.group.posts.select_related('author'),
+            'profile': self.author.posts.select_related('group'),
+        }
+        for name, posts in feeds.items():
+            yield name, False, FeedPaginator(posts, POSTS_PER_PAGE).page(
+                1
+            ).object_list
+            cursor_paginator = CursorPaginator(posts, POSTS_PER_PAGE)
+            for older in (True, False):
+                yield f'{name} cursor', True, order_by_keys(
+                    posts, cursor_paginator.keys, older
+                ).filter(
+                    keyset_filter(cursor_paginator.keys, values, older)
+                )[:POSTS_PER_PAGE + 1]
+        comments = self.post.comments.select_related('author')
+        yield 'comments', True, comments.order_by('-created', '-id')[
+            :POSTS_PER_PAGE
+        ]
+        yield 'timeline', True, order_by_keys(
+            TimelineEntry.objects.filter(user=self.reader), TIMELINE_KEYS
+        ).values_list(*TIMELINE_KEYS)[:POSTS_PER_PAGE]
+
+    def test_feed_queries_use_indexes(self):
+        """Каждый запрос ленты использует индекс"""
+        for name, seek, queryset in self.feed_queries():
+            with self.subTest(feed=name):
+                self.assertUsesIndexes(queryset, seek)
+
+    def test_follow_is_unique(self):
+        """Повторная подписка запрещена на уровне базы"""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.reader, author=self.author)
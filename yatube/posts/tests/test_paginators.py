@@ -0,0 +1,241 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Group, Post
+from ..paginators import (CursorPaginator, FeedPaginator, count_cache_key,
+                          encode_cursor, estimate_count)
+
+User = get_user_model()
+POSTS_PER_PAGE = settings.POSTS_PER_PAGE
+MAX_OFFSET_PAGES = settings.MAX_OFFSET_PAGES
+
+
+class CursorPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='cursor_author')
+        cls.TOTAL_POSTS = POSTS_PER_PAGE * (MAX_OFFSET_PAGES + 1) + 3
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый текст {i}', author=cls.author)
+            for i in range(cls.TOTAL_POSTS)
+        )
+        # Ties on pub_date have to be broken by the primary key
+        Post.objects.filter(pk__lte=Post.objects.order_by('pk')[5].pk).update(
+            pub_date=timezone.now()
+        )
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True
+            )
+        )
+        cls.INDEX_REVERSE = reverse('posts:index')
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def walk(self):
+        paginator = CursorPaginator(Post.objects.all(), POSTS_PER_PAGE)
+        page = paginator.page()
+        pages = [page]
+        while page.has_next():
+            page = paginator.page(after=page.next_cursor)
+            pages.append(page)
+        return pages
+
+    def test_cursor_walk_covers_feed(self):
+        """Курсоры проходят всю ленту без пропусков и повторов"""
+        pages = self.walk()
+        seen = [post.pk for page in pages for post in page]
+        self.assertEqual(seen, self.expected)
+        self.assertFalse(pages[0].has_previous())
+
+    def test_cursor_page_is_stable_on_insert(self):
+        """Новые посты не сдвигают уже выданные страницы"""
+        paginator = CursorPaginator(Post.objects.all(), POSTS_PER_PAGE)
+        first = paginator.page()
+        Post.objects.create(text='Свежий пост', author=self.author)
+        second = paginator.page(after=first.next_cursor)
+        self.assertEqual(
+            [post.pk for post in second],
+            self.expected[POSTS_PER_PAGE:POSTS_PER_PAGE * 2]
+        )
+
+    def test_cursor_before_returns_previous_page(self):
+        """Токен before возвращает предыдущую страницу"""
+        pages = self.walk()
+        paginator = CursorPaginator(Post.objects.all(), POSTS_PER_PAGE)
+        previous = paginator.page(before=pages[2].previous_cursor)
+        self.assertEqual(
+            [post.pk for post in previous],
+            [post.pk for post in pages[1]]
+        )
+
+    def test_cursor_page_does_not_count(self):
+        """Курсорная страница - один запрос без COUNT(*)"""
+        post = Post.objects.order_by('-pub_date', '-pk')[POSTS_PER_PAGE * 3]
+        paginator = CursorPaginator(Post.objects.all(), POSTS_PER_PAGE)
+        with self.assertNumQueries(1):
+            page = paginator.page(after=encode_cursor(post))
+        self.assertEqual(len(page), POSTS_PER_PAGE)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        """Испорченный токен ведет на первую страницу"""
+        for token in ('garbage', encode_cursor(self.author, ('username',))):
+            with self.subTest(token=token):
+                response = self.guest_client.get(
+                    self.INDEX_REVERSE, {'after': token}
+                )
+                self.assertEqual(
+                    [post.pk for post in response.context['page_obj']],
+                    self.expected[:POSTS_PER_PAGE]
+                )
+
+    def test_deep_offset_page_links_to_cursor(self):
+        """Неглубокие ?page=N работают, дальше навигация идет курсором"""
+        response = self.guest_client.get(
+            self.INDEX_REVERSE, {'page': MAX_OFFSET_PAGES}
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(
+            [post.pk for post in page_obj],
+            self.expected[
+                POSTS_PER_PAGE * (MAX_OFFSET_PAGES - 1):
+                POSTS_PER_PAGE * MAX_OFFSET_PAGES
+            ]
+        )
+        self.assertContains(response, f'?after={page_obj.next_cursor}')
+        response = self.guest_client.get(
+            self.INDEX_REVERSE, {'after': page_obj.next_cursor}
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            self.expected[POSTS_PER_PAGE * MAX_OFFSET_PAGES:][
+                :POSTS_PER_PAGE
+            ]
+        )
+
+    def test_deep_page_number_is_clamped(self):
+        """Слишком глубокий номер ведет на последнюю страницу по номеру"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(
+                self.INDEX_REVERSE, {'page': MAX_OFFSET_PAGES + 3}
+            )
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.number, MAX_OFFSET_PAGES)
+        offset = POSTS_PER_PAGE * (MAX_OFFSET_PAGES - 1)
+        self.assertEqual(
+            [post.pk for post in page_obj],
+            self.expected[offset:offset + POSTS_PER_PAGE]
+        )
+        for query in queries:
+            self.assertNotIn(
+                f'OFFSET {offset + POSTS_PER_PAGE}', query['sql']
+            )
+
+    def test_numbered_pages_link_by_cursor(self):
+        """Соседние страницы неглубоких номеров открываются токенами"""
+        response = self.guest_client.get(self.INDEX_REVERSE, {'page': 2})
+        page_obj = response.context['page_obj']
+        self.assertContains(response, f'?before={page_obj.previous_cursor}')
+        self.assertContains(response, f'?after={page_obj.next_cursor}')
+        response = self.guest_client.get(
+            self.INDEX_REVERSE, {'after': page_obj.next_cursor}
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            self.expected[POSTS_PER_PAGE * 2:POSTS_PER_PAGE * 3]
+        )
+
+
+class CachedCountTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='count_author')
+        cls.group = Group.objects.create(
+            title='тестовое название',
+            slug='count-slug',
+            description='тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.author,
+            group=cls.group,
+        )
+        cls.GROUP_KEY = count_cache_key('group', cls.group.pk)
+
+    def setUp(self):
+        cache.clear()
+
+    def paginator(self):
+        return FeedPaginator(
+            self.group.posts.all(), POSTS_PER_PAGE, count_key=self.GROUP_KEY
+        )
+
+    def test_count_is_cached(self):
+        """Повторный подсчет берется из кэша"""
+        self.assertEqual(self.paginator().count, 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.paginator().count, 1)
+
+    def test_count_invalidated_on_create_and_delete(self):
+        """Создание и удаление поста сбрасывают счетчик"""
+        self.assertEqual(self.paginator().count, 1)
+        post = Post.objects.create(
+            text='Еще пост', author=self.author, group=self.group
+        )
+        self.assertEqual(self.paginator().count, 2)
+        post.delete()
+        self.assertEqual(self.paginator().count, 1)
+
+    def test_count_invalidated_on_group_change(self):
+        """Перенос поста в другую группу сбрасывает счетчик старой группы"""
+        self.assertEqual(self.paginator().count, 1)
+        self.post.group = None
+        self.post.save()
+        self.assertEqual(self.paginator().count, 0)
+
+    @mock.patch('posts.paginators.COUNT_ESTIMATE_THRESHOLD', 1)
+    def test_large_table_uses_estimate(self):
+        """Для большой таблицы используется оценка планировщика"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Оценка проверяется на SQLite')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        # bulk_create skips signals, so the real total drifts from the stats
+        Post.objects.bulk_create(
+            Post(text='Тестовый текст', author=self.author) for _ in range(3)
+        )
+        paginator = FeedPaginator(
+            Post.objects.all(), POSTS_PER_PAGE,
+            count_key=count_cache_key('index')
+        )
+        self.assertEqual(paginator.count, 1)
+        # An underestimated count must not truncate the page itself
+        self.assertEqual(len(paginator.page(1)), 4)
+
+    def test_postgresql_estimate(self):
+        """reltuples PostgreSQL - число с точкой, -1 без статистики"""
+        fake = mock.MagicMock(vendor='postgresql')
+        cursor = fake.cursor.return_value.__enter__.return_value
+        for reltuples, expected in ((1234.0, 1234), (-1.0, None)):
+            with self.subTest(reltuples=reltuples):
+                cursor.fetchone.return_value = (reltuples,)
+                with mock.patch(
+                    'posts.paginators.connections', {'default': fake}
+                ):
+                    self.assertEqual(
+                        estimate_count(Post.objects.all()), expected
+                    )
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+POSTS_PER_PAGE = settings.POSTS_PER_PAGE
+# Session + user lookups of an authorized client
+AUTH_QUERIES = 2
+
+
+class FeedQueryBudgetTests(TestCase):
+    """Количество запросов ленты не зависит от числа постов на странице"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='reader')
+        cls.groups = [
+            Group.objects.create(
+                title=f'тестовая группа {i}',
+                slug=f'budget-slug-{i}',
+                description='тестовое описание',
+            ) for i in range(2)
+        ]
+        # Every post on a page has its own author and a rotating group
+        cls.authors = [
+            User.objects.create(username=f'budget_author_{i}')
+            for i in range(POSTS_PER_PAGE + 2)
+        ]
+        for i, author in enumerate(cls.authors):
+            Follow.objects.create(user=cls.reader, author=author)
+            Post.objects.create(
+                text=f'тестовый текст {i}',
+                author=author,
+                group=cls.groups[i % len(cls.groups)],
+            )
+            Post.objects.create(
+                text=f'тестовый текст автора {i}',
+                author=cls.authors[0],
+                group=cls.groups[i % len(cls.groups)],
+            )
+        # Group and profile totals come from the counters. The index pays
+        # for a cold count cache (COUNT(*) plus a planner statistics
+        # lookup), the follow feed reads the followed authors (for its page
+        # cache key), counts its timeline and reads the popular authors
+        cls.budgets = {
+            reverse('posts:index'): 3,
+            reverse(
+                'posts:group_posts',
+                kwargs={'slug': cls.groups[0].slug}
+            ): 2,
+            reverse(
+                'posts:profile',
+                kwargs={'username': cls.authors[0].username}
+            ): 3,
+            reverse('posts:follow_index'): 5,
+        }
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        cache.clear()
+
+    def test_feed_query_budget(self):
+        """Лента укладывается в бюджет запросов"""
+        for url, budget in self.budgets.items():
+            with self.subTest(url=url):
+                cache.clear()
+                with self.assertNumQueries(budget + AUTH_QUERIES):
+                    response = self.authorized_client.get(url)
+                self.assertEqual(
+                    len(response.context['page_obj']),
+                    POSTS_PER_PAGE
+                )
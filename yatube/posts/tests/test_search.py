@@ -0,0 +1,137 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Post, SearchTerm
+
+User = get_user_model()
+
+
+class SearchBackendMixin:
+    """Общие проверки для обоих поисковых бэкендов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='search_author')
+        cls.in_text = Post.objects.create(
+            text='Рассказ про ежи и <script>ежиков</script>',
+            author=cls.author,
+        )
+        cls.in_header = Post.objects.create(
+            header='Ежи',
+            text='Иллюстрированный рассказ',
+            author=cls.author,
+        )
+        cls.other = Post.objects.create(
+            text='Совсем другой текст',
+            author=cls.author,
+        )
+
+    def results(self, query):
+        return search.SearchResults(query, self.backend)[0:10]
+
+    def test_header_matches_rank_first(self):
+        """Совпадение в заголовке весит больше совпадения в тексте"""
+        self.assertEqual(
+            [post.pk for post in self.results('ежи')],
+            [self.in_header.pk, self.in_text.pk]
+        )
+
+    def test_every_word_is_required(self):
+        """В результатах только посты со всеми словами запроса"""
+        self.assertEqual(
+            [post.pk for post in self.results('про ежи')],
+            [self.in_text.pk]
+        )
+        self.assertEqual(search.SearchResults('ежи отсутствует').count(), 0)
+
+    def test_snippet_is_highlighted_and_escaped(self):
+        """Фрагмент подсвечивает слова запроса и экранирует HTML"""
+        snippet = self.results('ежиков')[0].snippet
+        self.assertIn('<mark>ежиков</mark>', snippet)
+        self.assertIn('&lt;script&gt;', snippet)
+        self.assertNotIn('<script>', snippet)
+
+    def test_case_and_punctuation_are_ignored(self):
+        """Регистр и знаки в запросе не мешают поиску"""
+        self.assertEqual(
+            search.SearchResults('"ЕЖИ"*', self.backend).count(), 2
+        )
+
+
+class Fts5BackendTests(SearchBackendMixin, TestCase):
+    backend = search.Fts5Backend()
+
+
+class InvertedIndexBackendTests(SearchBackendMixin, TestCase):
+    backend = search.InvertedIndexBackend()
+
+    def setUp(self):
+        self.backend.index(Post.objects.all())
+
+    def test_index_is_replaced_on_reindex(self):
+        """Повторная индексация заменяет термы поста"""
+        self.other.text = 'Ежи'
+        self.backend.index([self.other])
+        self.assertEqual(
+            SearchTerm.objects.filter(post=self.other).count(), 1
+        )
+
+
+class SearchViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='search_view_author')
+        cls.SEARCH_REVERSE = reverse('posts:search')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            text='Пост о тюленях',
+            author=self.author,
+        )
+
+    def found(self, query):
+        response = self.guest_client.get(self.SEARCH_REVERSE, {'q': query})
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_search_page(self):
+        """Страница поиска показывает найденные посты"""
+        response = self.guest_client.get(
+            self.SEARCH_REVERSE, {'q': 'тюленях'}
+        )
+        self.assertContains(response, '<mark>тюленях</mark>')
+        self.assertIsNone(
+            self.guest_client.get(self.SEARCH_REVERSE).context['page_obj']
+        )
+
+    def test_no_results(self):
+        """Запрос без результатов показывает, что ничего не найдено"""
+        response = self.guest_client.get(
+            self.SEARCH_REVERSE, {'q': 'моржах'}
+        )
+        self.assertContains(response, 'Найдено: 0')
+        self.assertContains(response, 'Ничего не найдено')
+
+    def test_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении поста"""
+        self.post.text = 'Пост о моржах'
+        self.post.save()
+        self.assertEqual(self.found('тюленях'), [])
+        self.assertEqual(self.found('моржах'), [self.post.pk])
+        self.post.delete()
+        self.assertEqual(self.found('моржах'), [])
+
+    def test_rebuild_command(self):
+        """Команда пересобирает индекс с нуля"""
+        search.backend().clear()
+        self.assertEqual(self.found('тюленях'), [])
+        output = StringIO()
+        call_command('rebuild_search_index', verbosity=0, stdout=output)
+        self.assertIn('проиндексировано постов 1', output.getvalue())
+        self.assertEqual(self.found('тюленях'), [self.post.pk])
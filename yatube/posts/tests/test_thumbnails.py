@@ -0,0 +1,149 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import default
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='thumbnail_author')
+        cls.INDEX_REVERSE = reverse('posts:index')
+        cls.CREATE_REVERSE = reverse('posts:post_create')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=self.author,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        self.DETAIL_REVERSE = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+
+    def test_pages_never_decode_images(self):
+        """До создания миниатюр страницы выводят заглушку"""
+        with mock.patch.object(
+            default.engine, 'get_image', side_effect=AssertionError
+        ):
+            for url in (self.INDEX_REVERSE, self.DETAIL_REVERSE):
+                with self.subTest(url=url):
+                    response = self.guest_client.get(url)
+                    self.assertNotContains(response, '<img class="card-img')
+                    self.assertContains(response, 'bg-light')
+
+    def test_generated_thumbnails_replace_placeholder(self):
+        """Готовые миниатюры сразу появляются в ленте и на странице поста"""
+        for url in (self.INDEX_REVERSE, self.DETAIL_REVERSE):
+            self.guest_client.get(url)
+        thumbnails.generate(self.post.image.name)
+        for url in (self.INDEX_REVERSE, self.DETAIL_REVERSE):
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.guest_client.get(url), '<img class="card-img'
+                )
+
+    def test_readiness_survives_cache_clear(self):
+        """Готовые миниатюры не сменяются заглушкой после очистки кэша"""
+        thumbnails.generate(self.post.image.name)
+        cache.clear()
+        for url in (self.INDEX_REVERSE, self.DETAIL_REVERSE):
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.guest_client.get(url), '<img class="card-img'
+                )
+
+    def test_new_image_is_not_ready(self):
+        """Картинка, замененная в обход форм, ждет своих миниатюр"""
+        thumbnails.generate(self.post.image.name)
+        self.post.refresh_from_db()
+        self.post.image = SimpleUploadedFile(
+            'other.gif', SMALL_GIF.replace(b'\x02\x0C', b'\x02\x0D'),
+            'image/gif'
+        )
+        with mock.patch.object(
+            thumbnails.transaction, 'on_commit', lambda job: job()
+        ), mock.patch.object(thumbnails, '_submit') as submit:
+            self.post.save()
+        submit.assert_called_once_with(self.post.image.name)
+        self.post.refresh_from_db()
+        self.assertFalse(thumbnails.is_ready(
+            self.post.image.name, self.post.thumbnails_version
+        ))
+
+    def test_picture_lists_every_variant(self):
+        """Готовая картинка выводится через <picture> со всеми ширинами"""
+        thumbnails.generate(self.post.image.name)
+        response = self.guest_client.get(self.DETAIL_REVERSE)
+        for width in thumbnails.WIDTHS:
+            self.assertContains(response, f' {width}w', count=len(
+                thumbnails.FORMATS
+            ))
+        if 'WEBP' in thumbnails.FORMATS:
+            self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, 'width="960" height="339"')
+
+    def test_feed_resolves_pictures_without_kvstore(self):
+        """Адреса миниатюр ленты вычисляются без обращений к kvstore"""
+        for number in range(3):
+            post = Post.objects.create(
+                text=f'Пост {number}',
+                author=self.author,
+                image=SimpleUploadedFile(
+                    f'feed{number}.gif', SMALL_GIF, 'image/gif'
+                ),
+            )
+            thumbnails.generate(post.image.name)
+        with mock.patch.object(
+            default.kvstore, 'get', side_effect=AssertionError
+        ):
+            response = self.guest_client.get(self.INDEX_REVERSE)
+        # The same bytes are one file, the setUp post shows it as well
+        self.assertContains(response, '<img class="card-img', count=4)
+
+    def test_create_schedules_generation(self):
+        """Создание поста с картинкой ставит миниатюры в очередь"""
+        with mock.patch.object(
+            thumbnails.transaction, 'on_commit', lambda job: job()
+        ), mock.patch.object(thumbnails, '_submit') as submit:
+            self.author_client.post(self.CREATE_REVERSE, data={
+                'text': 'Новый пост',
+                'image': SimpleUploadedFile(
+                    'new.gif', SMALL_GIF, 'image/gif'
+                ),
+            })
+        submit.assert_called_once_with(Post.objects.first().image.name)
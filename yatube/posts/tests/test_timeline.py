@@ -0,0 +1,189 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry
+from ..paginators import CursorPaginator
+from ..timeline import FollowFeed
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='timeline_author')
+        cls.other = User.objects.create(username='timeline_other')
+        cls.reader = User.objects.create(username='timeline_reader')
+        cls.old_post = Post.objects.create(
+            text='Пост до подписки',
+            author=cls.author,
+        )
+        cls.FOLLOW_REVERSE = reverse('posts:follow_index')
+        cls.PROFILE_FOLLOW_REVERSE = reverse(
+            'posts:profile_follow',
+            kwargs={'username': cls.author.username}
+        )
+        cls.PROFILE_UNFOLLOW_REVERSE = reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': cls.author.username}
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        cache.clear()
+
+    def timeline_ids(self, user):
+        return list(
+            TimelineEntry.objects.filter(user=user).order_by(
+                '-pub_date', '-post_id'
+            ).values_list('post_id', flat=True)
+        )
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка переносит посты автора в ленту, отписка убирает"""
+        self.reader_client.get(self.PROFILE_FOLLOW_REVERSE)
+        self.assertEqual(self.timeline_ids(self.reader), [self.old_post.pk])
+        self.reader_client.get(self.PROFILE_UNFOLLOW_REVERSE)
+        self.assertEqual(self.timeline_ids(self.reader), [])
+
+    def test_new_post_is_pushed_to_followers(self):
+        """Новый пост попадает только в ленты подписчиков"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        Post.objects.create(text='Чужой пост', author=self.other)
+        self.assertEqual(
+            self.timeline_ids(self.reader), [post.pk, self.old_post.pk]
+        )
+        response = self.reader_client.get(self.FOLLOW_REVERSE)
+        self.assertEqual(
+            [item.pk for item in response.context['page_obj']],
+            [post.pk, self.old_post.pk]
+        )
+
+    def test_feed_follows_renamed_author(self):
+        """После переименования автора его новые посты видны в ленте"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        author = User.objects.get(pk=self.author.pk)
+        self.reader_client.get(self.FOLLOW_REVERSE)
+        author.username = 'timeline_renamed'
+        author.save()
+        self.reader_client.get(self.FOLLOW_REVERSE)
+        post = Post.objects.create(text='После переименования', author=author)
+        response = self.reader_client.get(self.FOLLOW_REVERSE)
+        self.assertEqual(response.context['page_obj'][0].pk, post.pk)
+        response = self.reader_client.get(
+            reverse('posts:profile', kwargs={'username': author.username})
+        )
+        self.assertEqual(response.context['page_obj'][0].pk, post.pk)
+
+    def test_deleted_post_leaves_timeline(self):
+        """Удаленный пост пропадает из ленты"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        post.delete()
+        self.assertEqual(self.timeline_ids(self.reader), [self.old_post.pk])
+
+    def test_rebuild_command(self):
+        """Команда пересобирает ленты с нуля"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        TimelineEntry.objects.all().delete()
+        TimelineEntry.objects.create(
+            user=self.reader,
+            post=Post.objects.create(text='Лишний', author=self.other),
+            author=self.other,
+            pub_date=post.pub_date,
+        )
+        call_command('rebuild_timelines', batch_size=1, stdout=StringIO())
+        self.assertEqual(
+            self.timeline_ids(self.reader), [post.pk, self.old_post.pk]
+        )
+
+
+class HybridFollowFeedTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.star = User.objects.create(username='star_author')
+        cls.author = User.objects.create(username='regular_author')
+        cls.reader = User.objects.create(username='hybrid_reader')
+        cls.fan = User.objects.create(username='hybrid_fan')
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('posts.timeline.PULL_THRESHOLD', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.fan, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.posts = [
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=self.star if i % 2 else self.author,
+            ) for i in range(7)
+        ]
+        self.expected = [post.pk for post in reversed(self.posts)]
+
+    def test_popular_author_is_not_pushed(self):
+        """Посты популярного автора не рассылаются по лентам"""
+        self.assertFalse(
+            TimelineEntry.objects.filter(author=self.star).exists()
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 4
+        )
+
+    def test_author_below_threshold_is_pushed(self):
+        """Посты автора, ставшего непопулярным, остаются в лентах"""
+        Follow.objects.get(user=self.reader, author=self.star).delete()
+        self.assertEqual(
+            [post.pk for post in FollowFeed(self.fan)[0:10]],
+            [post.pk for post in reversed(self.posts[1::2])]
+        )
+
+    def test_count_is_capped(self):
+        """Подсчет ленты останавливается на COUNT_LIMIT постах"""
+        for limit, expected in ((3, 3), (5, 5), (100, len(self.posts))):
+            with self.subTest(limit=limit), \
+                    mock.patch('posts.timeline.COUNT_LIMIT', limit), \
+                    CaptureQueriesContext(connection) as queries:
+                self.assertEqual(FollowFeed(self.reader).count(), expected)
+                for query in queries:
+                    if 'COUNT(' in query['sql'].upper():
+                        self.assertIn('LIMIT', query['sql'].upper())
+
+    def test_feed_merges_pushed_and_pulled_posts(self):
+        """Лента сливает разосланные и подтянутые посты по дате"""
+        feed = FollowFeed(self.reader)
+        self.assertEqual(feed.count(), len(self.posts))
+        self.assertEqual([post.pk for post in feed[0:10]], self.expected)
+        self.assertEqual(
+            [post.pk for post in FollowFeed(self.fan)[0:10]],
+            [post.pk for post in reversed(self.posts[1::2])]
+        )
+
+    @mock.patch('posts.timeline.RECENT_POSTS', 2)
+    def test_cursor_walk_past_cached_recent_posts(self):
+        """Курсор проходит дальше кэшированного хвоста автора"""
+        paginator = CursorPaginator(FollowFeed(self.reader), 2)
+        page = paginator.page()
+        seen = [post.pk for post in page]
+        while page.has_next():
+            page = paginator.page(after=page.next_cursor)
+            seen.extend(post.pk for post in page)
+        self.assertEqual(seen, self.expected)
+        previous = paginator.page(before=page.previous_cursor)
+        self.assertEqual([post.pk for post in previous], self.expected[4:6])
@@ -0,0 +1,184 @@
+import hashlib
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template.defaultfilters import filesizeformat
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import media, uploads
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(size, format='JPEG', exif=None):
+    output = io.BytesIO()
+    image = Image.new('RGB', size, 'red')
+    if exif is None:
+        image.save(output, format)
+    else:
+        image.save(output, format, exif=exif)
+    return SimpleUploadedFile(
+        f'photo.{format.lower()}', output.getvalue(),
+        f'image/{format.lower()}'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='upload_author')
+        cls.CREATE_REVERSE = reverse('posts:post_create')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def create(self, image):
+        return self.author_client.post(
+            self.CREATE_REVERSE, data={'text': 'Пост', 'image': image}
+        )
+
+    def test_oversized_upload_is_dropped(self):
+        """Слишком большой файл отбрасывается при приеме"""
+        with mock.patch.object(uploads, 'MAX_SIZE', 100):
+            response = self.create(make_image((100, 100)))
+        self.assertFormError(
+            response, 'form', 'image', f'Файл больше {filesizeformat(100)}'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_too_many_pixels_rejected_by_header(self):
+        """Изображение с лишними точками отклоняется до декодирования"""
+        with mock.patch.object(uploads, 'MAX_PIXELS', 100), \
+                mock.patch.object(uploads.ImageOps, 'exif_transpose',
+                                  side_effect=AssertionError):
+            response = self.create(make_image((20, 20), 'PNG'))
+        self.assertFormError(
+            response, 'form', 'image', 'Слишком большое изображение: 20x20'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_corrupt_image_rejected(self):
+        """Обрезанный файл - ошибка формы, а не ошибка сервера"""
+        data = make_image((200, 200)).read()
+        # The header is intact, the scan data ends halfway
+        truncated = SimpleUploadedFile(
+            'photo.jpeg', data[:len(data) // 2], 'image/jpeg'
+        )
+        response = self.create(truncated)
+        self.assertFormError(
+            response, 'form', 'image',
+            'Файл поврежден или не является изображением'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_image_is_downscaled_and_reencoded(self):
+        """Изображение уменьшается, поворачивается и теряет EXIF"""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        with mock.patch.object(uploads, 'MAX_SIDE', 50):
+            self.create(make_image((200, 100), 'PNG', exif=exif))
+        post = Post.objects.get()
+        self.assertRegex(post.image.name, r'^posts/\w\w/\w{64}\.jpg$')
+        with Image.open(post.image) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (25, 50))
+            self.assertTrue(image.info.get('progressive'))
+            self.assertFalse(image.getexif())
+
+    def test_image_metadata_is_recorded(self):
+        """Размеры, хеш и заглушка сохраняются вместе с картинкой"""
+        self.create(make_image((200, 100)))
+        post = Post.objects.get()
+        with post.image.open() as file:
+            data = file.read()
+        self.assertEqual((post.image_width, post.image_height), (200, 100))
+        self.assertEqual(post.image_hash, hashlib.sha256(data).hexdigest())
+        self.assertTrue(
+            post.image_placeholder.startswith('data:image/jpeg;base64,')
+        )
+        response = self.author_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, post.image_placeholder)
+
+    def test_image_replaced_outside_form(self):
+        """Картинка, замененная в обход формы, описывается заново"""
+        self.create(make_image((200, 100)))
+        post = Post.objects.get()
+        post.image = make_image((30, 40), 'PNG')
+        post.save()
+        post.refresh_from_db()
+        with post.image.open() as file:
+            data = file.read()
+        self.assertEqual((post.image_width, post.image_height), (30, 40))
+        self.assertEqual(post.image_hash, hashlib.sha256(data).hexdigest())
+
+    def test_admin_upload_is_processed(self):
+        """Картинка из админки уменьшается, как загруженная на сайте"""
+        admin = User.objects.create_superuser(
+            'upload_admin', 'admin@example.com', 'password'
+        )
+        self.create(make_image((200, 100)))
+        post = Post.objects.get()
+        self.author_client.force_login(admin)
+        with mock.patch.object(uploads, 'MAX_SIDE', 50):
+            self.author_client.post(
+                reverse('admin:posts_post_change', args=(post.pk,)),
+                data={
+                    'text': 'Пост', 'author': self.author.pk,
+                    'image': make_image((100, 200), 'PNG'),
+                }
+            )
+        post.refresh_from_db()
+        self.assertRegex(post.image.name, r'\.jpg$')
+        self.assertEqual((post.image_width, post.image_height), (25, 50))
+
+    def test_clearing_image_clears_metadata(self):
+        """Удаление картинки из поста очищает ее метаданные"""
+        self.create(make_image((200, 100)))
+        post = Post.objects.get()
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            data={'text': 'Пост', 'image-clear': 'on'}
+        )
+        post.refresh_from_db()
+        self.assertFalse(post.image)
+        self.assertEqual(post.image_hash, '')
+        self.assertIsNone(post.image_width)
+
+    def test_identical_uploads_share_one_file(self):
+        """Одинаковые картинки хранятся одним файлом, пока он нужен"""
+        self.create(make_image((100, 100)))
+        self.create(make_image((100, 100)))
+        first, second = Post.objects.all()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(
+            first.image.name,
+            f'posts/{first.image_hash[:2]}/{first.image_hash}.jpg'
+        )
+        storage = first.image.storage
+        with mock.patch.object(
+            media.transaction, 'on_commit', lambda job: job()
+        ):
+            first.delete()
+            self.assertTrue(storage.exists(second.image.name))
+            second.delete()
+            self.assertFalse(storage.exists(second.image.name))
@@ -158,19 +158,17 @@ class PostViewTests(TestCase):
             author=self.post.author,
             group=self.group
         )
-        # Checking how many posts there are
-        index_response_1 = self.authorized_client.get(self.INDEX_REVERSE)
-        # Getting, checking and deleting new post
+        index_response_1 = self.guest_client.get(self.INDEX_REVERSE)
+        # Nothing changed - the page comes straight from the cache
+        with self.assertNumQueries(0):
+            index_response_2 = self.guest_client.get(self.INDEX_REVERSE)
+        self.assertEqual(index_response_1.content, index_response_2.content)
+        # Deleting a post invalidates the cached page at once
         profile_response = self.authorized_client.get(self.PROFILE_REVERSE)
         self._test_context_method(profile_response)
         new_post = profile_response.context['page_obj'][0]
         new_post.delete()
-        # Checking how many posts there are after deletion - should be the same
-        index_response_2 = self.authorized_client.get(self.INDEX_REVERSE)
-        self.assertEqual(index_response_1.content, index_response_2.content)
-        # Checking again, but clearing cache first, - should not be the same
-        cache.clear()
-        index_response_3 = self.authorized_client.get(self.INDEX_REVERSE)
+        index_response_3 = self.guest_client.get(self.INDEX_REVERSE)
         self.assertNotEqual(index_response_1.content, index_response_3.content)
 
     def test_images_anywhere(self):
@@ -187,9 +185,9 @@ class PostViewTests(TestCase):
         )
         response = self.authorized_client.get(IMAGE_DETAIL_REVERSE)
         self._test_context_method(create)
-        self.assertEqual(
-            response.context['post'].image,
-            f'posts/{self.uploaded.name}'
+        self.assertRegex(
+            response.context['post'].image.name,
+            r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$'
         )
 
     def test_post_create_and_edit_forms(self):
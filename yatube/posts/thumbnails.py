@@ -0,0 +1,212 @@
+"""Миниатюры создаются в фоне при загрузке, а не при первом просмотре.
+
+Бэкенд sorl в шаблонах только читает готовую миниатюру из kvstore; пока
+ее нет, выводится заглушка. Каждая миниатюра существует в нескольких
+ширинах (THUMBNAIL_WIDTHS) и форматах (THUMBNAIL_FORMATS), все варианты
+создает generate() после коммита: в пуле из THUMBNAIL_WORKERS потоков или,
+если пула нет, в том же процессе после отправки ответа. picture() собирает
+из них srcset для <picture>. Готовность хранится в Post.thumbnails_version
+и не теряется вместе с кэшем.
+"""
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connections, transaction
+from django.dispatch import receiver
+from PIL import features
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import feed_cache
+from .models import Post
+
+RATIO = settings.THUMBNAIL_RATIO
+WIDTHS = settings.THUMBNAIL_WIDTHS
+# WebP needs Pillow built with libwebp, without it only JPEG is served
+FORMATS = tuple(
+    image_format for image_format in settings.THUMBNAIL_FORMATS
+    if image_format != 'WEBP' or features.check('webp')
+)
+MIME_TYPES = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+WORKERS = settings.THUMBNAIL_WORKERS
+
+
+def _geometry(width):
+    return f'{width}x{round(width * RATIO[1] / RATIO[0])}'
+
+
+def _options(image_format):
+    return {'crop': 'center', 'upscale': True, 'format': image_format}
+
+
+SPECS = tuple(
+    (_geometry(width), _options(image_format))
+    for image_format in FORMATS for width in WIDTHS
+)
+# Changing the variants or the storage of the sources (it is part of the
+# thumbnail names) makes every image "not ready" until regenerated
+SPECS_VERSION = hashlib.md5(repr((
+    SPECS, type(Post._meta.get_field('image').storage).__name__
+)).encode()).hexdigest()[:8]
+
+logger = logging.getLogger(__name__)
+_pool = None
+_pending = threading.local()
+
+
+class DeferredThumbnailBackend(ThumbnailBackend):
+    """Никогда не декодирует изображения во время запроса."""
+
+    def _merge_options(self, source, options):
+        # The same defaults sorl applies, so the file names match
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def thumbnail_name(self, file_, geometry_string, **options):
+        """Имя файла миниатюры: вычисляется, без обращения к хранилищу."""
+        source = ImageFile(file_)
+        return self._get_thumbnail_filename(
+            source, geometry_string, self._merge_options(source, options)
+        )
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        name = self.thumbnail_name(file_, geometry_string, **options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+    def generate(self, file_, geometry_string, **options):
+        return super().get_thumbnail(file_, geometry_string, **options)
+
+
+def generate(name):
+    """Создает все миниатюры изображения и обновляет ленты с ним."""
+    for geometry, options in SPECS:
+        default.backend.generate(name, geometry, **options)
+    # Readiness goes before the bump: a page rendered under the old
+    # generation is never read again. A post whose image has changed
+    # since no longer matches
+    Post.objects.filter(image=name).update(thumbnails_version=SPECS_VERSION)
+    posts = Post.objects.filter(image=name).select_related('author')
+    for post in posts:
+        feed_cache.bump(*feed_cache.post_scopes(post))
+
+
+def _generate_logged(name):
+    try:
+        generate(name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+
+
+def _work(name):
+    try:
+        _generate_logged(name)
+    finally:
+        connections.close_all()
+
+
+def _submit(name):
+    global _pool
+    if not WORKERS:
+        _pending.names = [*getattr(_pending, 'names', []), name]
+        return
+    if _pool is None:
+        _pool = ThreadPoolExecutor(WORKERS, thread_name_prefix='thumbnails')
+    _pool.submit(_work, name)
+
+
+@receiver(request_finished)
+def run_pending(**kwargs):
+    """Создает отложенные миниатюры, когда ответ уже отдан клиенту."""
+    names = getattr(_pending, 'names', [])
+    _pending.names = []
+    for name in names:
+        _generate_logged(name)
+
+
+def schedule(post):
+    """Ставит миниатюры изображения поста в очередь после коммита.
+
+    Вызывается из post_saved для новой картинки поста. Одинаковые
+    картинки хранятся одним файлом, и для уже готовых миниатюр ничего
+    не создается.
+    """
+    name = post.image.name
+    version = ''
+    # The post itself still carries the version of its previous image
+    if name and Post.objects.filter(
+        image=name, thumbnails_version=SPECS_VERSION
+    ).exclude(pk=post.pk).exists():
+        version = SPECS_VERSION
+    Post.objects.filter(pk=post.pk).update(thumbnails_version=version)
+    post.thumbnails_version = version
+    if name and not version:
+        transaction.on_commit(lambda: _submit(name))
+
+
+def is_ready(name, version):
+    return bool(name) and version == SPECS_VERSION
+
+
+def mark_ready(posts):
+    """Проставляет post.thumbnails_ready по столбцу, без запросов."""
+    for post in posts:
+        post.thumbnails_ready = is_ready(
+            post.image.name, post.thumbnails_version
+        )
+
+
+def picture(post):
+    """Варианты миниатюры для <picture> или None, пока они не готовы.
+
+    Готовность - столбец поста (см. mark_ready), имена и
+    адреса вариантов вычисляются без kvstore и хранилища. Последний
+    формат из FORMATS служит запасным для <img>.
+    """
+    ready = getattr(post, 'thumbnails_ready', None)
+    if ready is None:
+        ready = is_ready(post.image.name, post.thumbnails_version)
+    if not ready:
+        return None
+    sources = []
+    for image_format in FORMATS:
+        srcset = []
+        for width in WIDTHS:
+            url = default.storage.url(default.backend.thumbnail_name(
+                post.image, _geometry(width), **_options(image_format)
+            ))
+            srcset.append(f'{url} {width}w')
+            if width == RATIO[0]:
+                src = url
+        sources.append({
+            'type': MIME_TYPES[image_format],
+            'srcset': ', '.join(srcset),
+        })
+    return {
+        'sources': sources[:-1],
+        'srcset': sources[-1]['srcset'],
+        'src': src,
+    }
+
+
+def attach_pictures(posts):
+    """Кладет в post.picture варианты миниатюр всей страницы.
+
+    Сколько бы постов ни было на странице, ни одного запроса.
+    """
+    mark_ready(posts)
+    for post in posts:
+        post.picture = picture(post)
@@ -0,0 +1,237 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .paginators import keyset_filter
+
+BATCH_SIZE = settings.TIMELINE_BATCH_SIZE
+BACKFILL_LIMIT = settings.TIMELINE_BACKFILL_LIMIT
+PULL_THRESHOLD = settings.FOLLOW_PULL_THRESHOLD
+RECENT_POSTS = settings.AUTHOR_RECENT_POSTS
+TIMELINE_CACHE_TIMEOUT = settings.TIMELINE_CACHE_TIMEOUT
+# Timeline entries carry the post's sort keys under their own names
+TIMELINE_KEYS = ('pub_date', 'post_id')
+# The follow feed shows no total: its paginator only needs to know whether
+# there are more posts than fit into the numbered pages
+COUNT_LIMIT = settings.MAX_OFFSET_PAGES * settings.POSTS_PER_PAGE + 1
+
+
+def _entry(user_id, post_id, author_id, pub_date):
+    return TimelineEntry(
+        user_id=user_id,
+        post_id=post_id,
+        author_id=author_id,
+        pub_date=pub_date,
+    )
+
+
+def _recent_key(author_id):
+    return f'recent_posts:{author_id}'
+
+
+def is_pulled(author_id):
+    """Посты автора с большим числом подписчиков читаются, а не рассылаются."""
+    return UserStats.objects.filter(
+        pk=author_id, follower_count__gte=PULL_THRESHOLD
+    ).exists()
+
+
+def _push(author_id, posts):
+    # posts: (pk, pub_date) pairs, each goes to every follower
+    follower_ids = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    batch = []
+    for user_id in follower_ids.iterator(chunk_size=BATCH_SIZE):
+        batch.extend(
+            _entry(user_id, post_id, author_id, pub_date)
+            for post_id, pub_date in posts
+        )
+        if len(batch) >= BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def _latest_posts(author_id):
+    return Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-pk'
+    ).values_list('pk', 'pub_date')[:BACKFILL_LIMIT]
+
+
+def push_post(post):
+    """Раскладывает новый пост по лентам всех подписчиков автора."""
+    forget_post(post)
+    if is_pulled(post.author_id):
+        return
+    _push(post.author_id, [(post.pk, post.pub_date)])
+
+
+def follower_lost(author_id):
+    """Автор, опустившийся ниже порога, снова рассылает посты.
+
+    Пока посты читались, их не получал ни один подписчик, так что
+    последние BACKFILL_LIMIT постов раскладываются по всем лентам разом.
+    """
+    count = UserStats.objects.filter(pk=author_id).values_list(
+        'follower_count', flat=True
+    ).first()
+    if count == PULL_THRESHOLD - 1:
+        _push(author_id, list(_latest_posts(author_id)))
+
+
+def forget_post(post):
+    cache.delete(_recent_key(post.author_id))
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты автора."""
+    if is_pulled(author_id):
+        return
+    TimelineEntry.objects.bulk_create(
+        (
+            _entry(user_id, post_id, author_id, pub_date)
+            for post_id, pub_date in _latest_posts(author_id)
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты подписчика посты автора."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild(user_ids):
+    """Пересобирает ленты пользователей с нуля."""
+    TimelineEntry.objects.filter(user_id__in=user_ids).delete()
+    follows = Follow.objects.filter(user_id__in=user_ids).values_list(
+        'user_id', 'author_id'
+    )
+    for user_id, author_id in follows:
+        backfill(user_id, author_id)
+
+
+def _author_posts(author_id, values=None, older=True, limit=RECENT_POSTS):
+    posts = Post.objects.filter(author_id=author_id)
+    if values is not None:
+        posts = posts.filter(keyset_filter(('pub_date', 'pk'), values, older))
+    ordering = ('-pub_date', '-pk') if older else ('pub_date', 'pk')
+    return list(posts.order_by(*ordering).values_list('pub_date', 'pk')[
+        :limit
+    ])
+
+
+class FollowFeed:
+    """Лента подписок: разосланный timeline плюс посты популярных авторов.
+
+    Авторы, у которых не меньше FOLLOW_PULL_THRESHOLD подписчиков, не
+    рассылают посты по лентам. Их последние посты хранятся в кэше одним
+    списком на автора и сливаются с timeline читателя при чтении (k-way
+    merge по pub_date). Объект понимает срезы и count(), поэтому подходит
+    и для FeedPaginator, и для CursorPaginator (через window()). Посты
+    читаются из `posts`: моделями или, для values(), словарями с ключом pk.
+    """
+
+    def __init__(self, user, posts=None):
+        self.user = user
+        if posts is None:
+            posts = Post.objects.select_related('author', 'group')
+        self.posts = posts
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        return self.window(limit=index.stop)[index.start or 0:]
+
+    def count(self):
+        """Число постов, но не больше COUNT_LIMIT, как бы ни росла лента."""
+        total = TimelineEntry.objects.filter(user=self.user).order_by()[
+            :COUNT_LIMIT
+        ].count()
+        if self.pulled_authors and total < COUNT_LIMIT:
+            total += Post.objects.filter(
+                author_id__in=self.pulled_authors
+            ).exclude(timeline_entries__user=self.user).order_by()[
+                :COUNT_LIMIT - total
+            ].count()
+        return total
+
+    @cached_property
+    def pulled_authors(self):
+        return list(
+            Follow.objects.filter(
+                user=self.user,
+                author__stats__follower_count__gte=PULL_THRESHOLD,
+            ).values_list('author_id', flat=True)
+        )
+
+    def window(self, values=None, older=True, limit=None):
+        """Следующие `limit` постов после курсора `values`."""
+        sources = [self._timeline_keys(values, older, limit)]
+        sources.extend(
+            self._author_keys(pk, values, older, limit)
+            for pk in self.pulled_authors
+        )
+        keys = list(islice(
+            _unique(heapq.merge(*sources, reverse=older)), limit
+        ))
+        posts = {
+            _pk(post): post
+            for post in self.posts.filter(pk__in=[pk for _, pk in keys])
+        }
+        return [posts[pk] for _, pk in keys if pk in posts]
+
+    def _timeline_keys(self, values, older, limit):
+        entries = TimelineEntry.objects.filter(user=self.user)
+        if values is not None:
+            entries = entries.filter(
+                keyset_filter(TIMELINE_KEYS, values, older)
+            )
+        ordering = ('-pub_date', '-post_id') if older else (
+            'pub_date', 'post_id'
+        )
+        return list(entries.order_by(*ordering).values_list(
+            'pub_date', 'post_id'
+        )[:limit])
+
+    def _author_keys(self, author_id, values, older, limit):
+        if not older:
+            return _author_posts(author_id, values, older, limit)
+        recent = cache.get(_recent_key(author_id))
+        if recent is None:
+            recent = _author_posts(author_id)
+            cache.set(_recent_key(author_id), recent, TIMELINE_CACHE_TIMEOUT)
+        complete = len(recent) < RECENT_POSTS
+        if values is not None:
+            moment = parse_datetime(values[0])
+            if moment is None:
+                raise ValueError(values[0])
+            bound = (moment, int(values[1]))
+            recent = [key for key in recent if key < bound]
+        if not complete and (limit is None or len(recent) < limit):
+            # The window reaches past the cached list, read the rest
+            return _author_posts(author_id, values, older, limit)
+        return recent[:limit]
+
+
+def _pk(post):
+    return post['pk'] if isinstance(post, dict) else post.pk
+
+
+def _unique(keys):
+    seen = set()
+    for key in keys:
+        if key[1] not in seen:
+            seen.add(key[1])
+            yield key
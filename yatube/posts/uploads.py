@@ -0,0 +1,150 @@
+"""Прием изображений постов с ограниченным расходом памяти.
+
+Файл принимается потоком: до FILE_UPLOAD_MAX_MEMORY_SIZE в памяти, дальше
+во временном файле, а после IMAGE_UPLOAD_MAX_SIZE прием прекращается.
+Размеры проверяются по заголовку, до декодирования. JPEG декодируется
+сразу в уменьшенном масштабе (draft), остальные форматы - целиком, но не
+больше IMAGE_MAX_PIXELS точек. Пиковая память на загрузку - примерно
+IMAGE_MAX_PIXELS * 4 байта на RGBA-изображение плюс уменьшенная копия
+и готовый JPEG.
+"""
+import base64
+import hashlib
+import io
+import os
+
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.forms import ValidationError
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+MAX_SIZE = settings.IMAGE_UPLOAD_MAX_SIZE
+MAX_PIXELS = settings.IMAGE_MAX_PIXELS
+MAX_SIDE = settings.IMAGE_MAX_SIDE
+JPEG_QUALITY = settings.IMAGE_JPEG_QUALITY
+PLACEHOLDER_SIDE = settings.IMAGE_PLACEHOLDER_SIDE
+
+# Pillow refuses anything bigger before allocating pixels
+Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """Бросает файл, как только он превысил IMAGE_UPLOAD_MAX_SIZE."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > MAX_SIZE:
+            errors = getattr(self.request, 'upload_errors', {})
+            errors[self.field_name] = (
+                f'Файл больше {filesizeformat(MAX_SIZE)}'
+            )
+            self.request.upload_errors = errors
+            raise SkipFile
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def accept_uploads(request, form):
+    """Переносит в форму ошибки файлов, отброшенных при приеме."""
+    for field, message in getattr(request, 'upload_errors', {}).items():
+        form.add_error(field, message)
+    return not form.errors
+
+
+def _flatten(image):
+    # JPEG has no alpha: composite transparent images onto white
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _placeholder(image):
+    # A blurry few-pixel JPEG inline in the page, shown until the image loads
+    small = image.copy()
+    small.thumbnail((PLACEHOLDER_SIDE, PLACEHOLDER_SIDE))
+    output = io.BytesIO()
+    small.save(output, 'JPEG', quality=40)
+    encoded = base64.b64encode(output.getvalue()).decode()
+    return f'data:image/jpeg;base64,{encoded}'
+
+
+def metadata(image, data):
+    """Поля Post.image_* для декодированного изображения и его байтов."""
+    return {
+        'image_width': image.width,
+        'image_height': image.height,
+        'image_hash': hashlib.sha256(data).hexdigest(),
+        'image_placeholder': _placeholder(image),
+    }
+
+
+def empty_metadata():
+    return {
+        'image_width': None,
+        'image_height': None,
+        'image_hash': '',
+        'image_placeholder': '',
+    }
+
+
+def read_metadata(file):
+    """Метаданные уже сохраненного файла, для старых постов."""
+    file.seek(0)
+    data = file.read()
+    with Image.open(io.BytesIO(data)) as image:
+        width, height = image.size
+        image.draft('RGB', (PLACEHOLDER_SIDE, PLACEHOLDER_SIDE))
+        info = metadata(_flatten(ImageOps.exif_transpose(image)), data)
+    info.update(image_width=width, image_height=height)
+    return info
+
+
+def _decode(upload):
+    upload.seek(0)
+    try:
+        with Image.open(upload) as image:
+            width, height = image.size
+            if width * height > MAX_PIXELS:
+                raise ValidationError(
+                    f'Слишком большое изображение: {width}x{height}'
+                )
+            # JPEG decodes straight into a 1/2..1/8 scale, far below
+            # full size
+            image.draft('RGB', (MAX_SIDE, MAX_SIDE))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((MAX_SIDE, MAX_SIDE), Image.LANCZOS)
+            return _flatten(image)
+    # A truncated or corrupt file passes the header check and fails here
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise ValidationError('Файл поврежден или не является изображением')
+
+
+def process_image(upload):
+    """Уменьшает изображение и пересохраняет его прогрессивным JPEG.
+
+    EXIF не переносится: поворот из него применяется к пикселям, а
+    геометка и данные камеры пропадают вместе с остальными метаданными.
+    Возвращает новый файл и поля Post.image_* для него.
+    """
+    image = _decode(upload)
+    output = io.BytesIO()
+    image.save(
+        output, 'JPEG', quality=JPEG_QUALITY, optimize=True,
+        progressive=True,
+    )
+    name = os.path.splitext(os.path.basename(upload.name))[0] + '.jpg'
+    processed = InMemoryUploadedFile(
+        output, 'image', name, 'image/jpeg', output.tell(), None
+    )
+    return processed, metadata(image, output.getvalue())
@@ -1,32 +1,62 @@
 from datetime import datetime as dt
 
 from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
 
+from . import exports
+from .cards import attach_cards
+from .conditional import post_etag, post_last_modified
+from .feed_cache import (cache_feed, follow_scopes, group_scopes,
+                         index_scopes, profile_scopes)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
+from .models import Comment, Follow, Group, Post
+from .paginators import (FEED_KEYS, CursorPaginator, FeedPaginator,
+                         count_cache_key)
+from .search import SearchResults
+from .timeline import FollowFeed
+from .uploads import accept_uploads
 
 PPG = settings.POSTS_PER_PAGE
+COMMENTS_PER_PAGE = settings.COMMENTS_PER_PAGE
+COMMENT_KEYS = ('created', 'pk')
 User = get_user_model()
 
 
 # Technical Functions:
-def paginator_func(posts, request):
-    paginator = Paginator(posts, PPG)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+def paginator_func(posts, request, count_key=None, keys=FEED_KEYS,
+                   total=None):
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if after or before:
+        paginator = CursorPaginator(posts, PPG, keys, count_key, total)
+        page_obj = paginator.get_page(after, before)
+    else:
+        paginator = FeedPaginator(posts, PPG, keys, count_key, total)
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
+    attach_cards(page_obj)
     return page_obj
 
 
+def comments_page(post_id, request):
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    )
+    paginator = CursorPaginator(comments, COMMENTS_PER_PAGE, COMMENT_KEYS)
+    return paginator.get_page(request.GET.get('after'))
+
+
 # Main Page
-@cache_page(20, key_prefix='index_page')
+@cache_feed(index_scopes)
 def index(request):
-    posts = Post.objects.all()
-    page_obj = paginator_func(posts, request)
+    posts = Post.objects.select_related('author', 'group')
+    page_obj = paginator_func(posts, request, count_cache_key('index'))
     context = {
         'page_obj': page_obj
     }
@@ -34,10 +64,11 @@ def index(request):
 
 
 # Group Posts
+@cache_feed(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page_obj = paginator_func(posts, request)
+    posts = group.posts.select_related('author')
+    page_obj = paginator_func(posts, request, total=group.post_count)
     context = {
         'page_obj': page_obj,
         'group': group
@@ -46,10 +77,18 @@ def group_posts(request, slug):
 
 
 # Profile
+@cache_feed(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    page_obj = paginator_func(posts, request)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = author.posts.select_related('group')
+    # Users without a stats row fall back to the cached COUNT(*)
+    stats = getattr(author, 'stats', None)
+    page_obj = paginator_func(
+        posts, request, count_cache_key('profile', author.pk),
+        total=stats.post_count if stats else None
+    )
     following = request.user.is_authenticated and author.following.filter(
         user=request.user
     ).exists()
@@ -62,18 +101,43 @@ def profile(request, username):
 
 
 # Post Details
+@condition(etag_func=post_etag, last_modified_func=post_last_modified)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id
+    )
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
     context = {
         'post': post,
         'form': form,
-        'comments': comments
+        'comments': comments_page(post.pk, request)
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+# Next Comments (HTML fragment)
+def post_comments(request, post_id):
+    context = {
+        'post_id': post_id,
+        'comments': comments_page(post_id, request)
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+# Search
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        paginator = Paginator(SearchResults(query), PPG)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 # Post Creator
 @login_required
 def post_create(request):
@@ -85,7 +149,7 @@ def post_create(request):
         'form': form,
         'is_edit': False
     }
-    if form.is_valid():
+    if form.is_valid() and accept_uploads(request, form):
         temp_form = form.save(commit=False)
         temp_form.author = request.user
         temp_form.save()
@@ -104,7 +168,7 @@ def post_edit(request, post_id):
     )
     if request.user != post.author:
         return redirect('posts:post_detail', post_id)
-    if form.is_valid():
+    if form.is_valid() and accept_uploads(request, form):
         post.edited = dt.now()
         form.save()
         return redirect('posts:post_detail', post_id)
@@ -130,9 +194,9 @@ def add_comment(request, post_id):
 
 # Author's Posts
 @login_required
+@cache_feed(follow_scopes)
 def follow_index(request):
-    posts_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator_func(posts_list, request)
+    page_obj = paginator_func(FollowFeed(request.user), request)
     context = {
         'page_obj': page_obj,
     }
@@ -156,3 +220,24 @@ def profile_unfollow(request, username):
     if follow.exists():
         follow.delete()
     return redirect('posts:profile', username)
+
+
+# Data Export (staff only)
+@staff_member_required
+def export(request, kind):
+    file_format = request.GET.get('format', 'jsonl')
+    if kind not in exports.EXPORTS or file_format not in exports.FORMATS:
+        raise Http404
+    compress = request.GET.get('gzip') == '1'
+    response = StreamingHttpResponse(
+        exports.stream(kind, file_format, compress),
+        content_type=(
+            'application/gzip' if compress
+            else exports.CONTENT_TYPES[file_format]
+        ),
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="'
+        f'{exports.filename(kind, file_format, compress)}"'
+    )
+    return response
@@ -93,10 +93,24 @@ DATABASES = {
     }
 }
 
+# Hot keys are served from a per-process LRU, every worker shares 'shared'
+# (point it at memcached or redis in production, or at
+# core.caching.backends.shared_memory.SharedMemoryCache for the workers of
+# a single host)
 CACHES = {
     'default': {
+        'BACKEND': 'core.caching.backends.tiered.TieredCache',
+        'LOCATION': 'tiered',
+        'OPTIONS': {
+            'L2': 'shared',
+            'MAX_ENTRIES': 1000,
+            # Seconds an L1 entry is trusted before its stamp is re-checked
+            'CHECK_INTERVAL': 1,
+        },
+    },
+    'shared': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
 }
 
 V = 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'
@@ -146,6 +160,73 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 POSTS_PER_PAGE = 10
+# Comments are shown newest first, the rest is loaded by cursor on demand
+COMMENTS_PER_PAGE = 20
+
+# Deeper feed pages are served by cursor (?after=/?before=) pagination
+MAX_OFFSET_PAGES = 5
+
+# Feed row counts are cached until a post is created or deleted
+FEED_COUNT_TIMEOUT = 60 * 60 * 24
+# Above this many rows an unfiltered feed uses the planner's row estimate
+COUNT_ESTIMATE_THRESHOLD = 1000000
+
+# Follow feed timelines: fan-out batch size and posts copied on follow
+TIMELINE_BATCH_SIZE = 1000
+TIMELINE_BACKFILL_LIMIT = 1000
+# Authors with this many followers are pulled into follow feeds at read
+# time from a cached list of their latest AUTHOR_RECENT_POSTS posts
+FOLLOW_PULL_THRESHOLD = 10000
+AUTHOR_RECENT_POSTS = 200
+TIMELINE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Feed pages are cached until a post, follow, group or author changes
+FEED_PAGE_TIMEOUT = 60 * 60 * 24
+
+# Rendered post cards are cached per post version, see posts.cards
+POST_CARD_TIMEOUT = 60 * 60 * 24 * 7
+
+# Post images are shown cropped to THUMBNAIL_RATIO in every width and
+# format below (WebP is skipped if Pillow lacks it). The variants are
+# generated in the background after upload, requests only read them.
+# THUMBNAIL_RATIO[0] must be one of the widths, it is the <img> fallback
+THUMBNAIL_RATIO = (960, 339)
+THUMBNAIL_WIDTHS = (480, 960, 1440)
+THUMBNAIL_FORMATS = ('WEBP', 'JPEG')
+THUMBNAIL_QUALITY = 80
+# Threads generating thumbnails; 0 runs the jobs in the request's worker
+# once the response has been sent
+THUMBNAIL_WORKERS = 0
+THUMBNAIL_BACKEND = 'posts.thumbnails.DeferredThumbnailBackend'
+
+# JSON API pages hold POSTS_PER_PAGE items, ?limit= asks for up to this many
+API_MAX_LIMIT = 100
+
+# Search returns at most this many best matches; a header match weighs as
+# much as this many matches in the text
+SEARCH_MAX_RESULTS = 1000
+SEARCH_HEADER_WEIGHT = 5.0
+
+# Exports read a table in id windows of EXPORT_BATCH_SIZE rows, each one
+# through a server-side cursor fetching EXPORT_CHUNK_SIZE rows at a time
+EXPORT_BATCH_SIZE = 10000
+EXPORT_CHUNK_SIZE = 2000
+
+# Post images are dropped while streaming once they exceed the size and
+# rejected by their header above the pixel count; the rest is scaled down
+# and re-encoded as progressive JPEG. Peak memory per upload is about
+# IMAGE_MAX_PIXELS * 4 bytes, see posts.uploads
+IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_PIXELS = 24 * 1000 * 1000
+IMAGE_MAX_SIDE = 2048
+IMAGE_JPEG_QUALITY = 85
+# Longest side of the inline placeholder shown while an image loads
+IMAGE_PLACEHOLDER_SIDE = 16
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.LimitedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/